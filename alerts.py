@@ -0,0 +1,411 @@
+"""Overdue and soon-due alerts for executives, sent as per-executive digests.
+
+After each data refresh (a new data version or a new day) the per-process
+status frames, the same rules behind get_all_records_for_process(), are
+compared against the alert levels recorded on the previous evaluation. Only
+(ID, process) pairs that became overdue ("Vence hoy", "N días vencido") or
+entered the soon-due window since then produce an alert, so a case is
+reported once per level rather than on every refresh. The first evaluation
+only records the baseline: cases already overdue then are not announced. A
+new level is recorded together with one pending delivery per sink; a delivery
+is cleared once its sink took the executive's digest, so a sink that failed
+gets the digest again on the next evaluation and the others do not.
+
+Evaluation and delivery run on an asyncio event loop in a daemon thread; the
+dashboard only submits the work and never waits for it. Blocking steps (SQLite,
+SMTP, HTTP, file writes) run in worker threads, at most ALERT_CONCURRENCY at a
+time. Sinks are objects with a `name` and an async `send(digest)`; the ones
+listed in ALERT_SINKS (archivo, smtp, webhook) are built from environment
+variables, and others can be passed to check_alerts().
+
+Usage outside the dashboard (e.g. from cron): python alerts.py
+"""
+import asyncio
+import json
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import urllib.request
+from datetime import datetime
+from email.message import EmailMessage
+
+import numpy as np
+import pandas as pd
+
+from engine import PROCESSES
+
+ALERT_STATE_FILE = "alertas_danos.sqlite"
+ALERT_DIR = os.environ.get('ALERT_DIR', "alertas")
+ALERT_SINKS = os.environ.get('ALERT_SINKS', "archivo")
+ALERT_SOON_DAYS = int(os.environ.get('ALERT_SOON_DAYS', 3))
+ALERT_CONCURRENCY = int(os.environ.get('ALERT_CONCURRENCY', 8))
+ALERT_SMTP_HOST = os.environ.get('ALERT_SMTP_HOST', 'localhost')
+ALERT_SMTP_PORT = int(os.environ.get('ALERT_SMTP_PORT', 1025))
+ALERT_SENDER = os.environ.get('ALERT_SENDER', 'alertas@localhost')
+ALERT_RECIPIENTS_FILE = os.environ.get('ALERT_RECIPIENTS_FILE', "destinatarios_alertas.json")
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL', '')
+
+OVERDUE = 'vencido'
+DUE_SOON = 'por_vencer'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_state (
+    id INTEGER NOT NULL,
+    process TEXT NOT NULL,
+    level TEXT NOT NULL,
+    PRIMARY KEY (id, process)
+);
+CREATE TABLE IF NOT EXISTS alert_baseline (
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alert_pending (
+    id INTEGER NOT NULL,
+    process TEXT NOT NULL,
+    level TEXT NOT NULL,
+    sink TEXT NOT NULL,
+    PRIMARY KEY (id, process, sink)
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_checked = set()
+_loop = None
+_last_run = {}
+
+
+def connect(path=ALERT_STATE_FILE):
+    """Open the alert state database, creating the schema on first use"""
+    con = sqlite3.connect(path, timeout=30)
+    con.executescript(_SCHEMA)
+    return con
+
+
+def _flagged_rows(df, status_frames):
+    """(ID, process) pairs currently overdue or due within ALERT_SOON_DAYS, with their details"""
+    frames = []
+    for base_column in PROCESSES:
+        status = status_frames[base_column]
+        days = status['Días Restantes'].to_numpy(dtype='float64', na_value=np.nan)
+        flagged = days <= ALERT_SOON_DAYS
+        if not flagged.any():
+            continue
+        rows = df[flagged]
+        frames.append(pd.DataFrame({
+            'id': rows['ID'].to_numpy(),
+            'process': base_column,
+            'level': np.where(days[flagged] <= 0, OVERDUE, DUE_SOON),
+            'Ejecutivo': rows['Ejecutivo'].astype(object).fillna("Sin ejecutivo").to_numpy(),
+            'Cliente': rows['Cliente'].to_numpy(),
+            'Pólizas': rows['Pólizas'].to_numpy(),
+            'Fecha Base': rows[base_column].dt.strftime('%d/%m/%Y').to_numpy(),
+            'Estado': status['Status'][flagged].astype(object).to_numpy(),
+            'Días Restantes': days[flagged].astype(np.int64),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['id', 'process', 'level', 'Ejecutivo', 'Cliente', 'Pólizas', 'Fecha Base',
+                                     'Estado', 'Días Restantes'])
+    current = pd.concat(frames, ignore_index=True)
+    current = current[current['id'].notna()].drop_duplicates(subset=['id', 'process'])
+    current['id'] = current['id'].astype('int64')
+    return current
+
+
+def _upsert_levels(con, alerts):
+    con.executemany("INSERT OR REPLACE INTO alert_state (id, process, level) VALUES (?, ?, ?)",
+                    alerts[['id', 'process', 'level']].itertuples(index=False, name=None))
+
+
+def evaluate(df, status_frames, path=ALERT_STATE_FILE, sink_names=()):
+    """New alerts since the last evaluation, and the deliveries pending per sink
+
+    The levels of the new alerts are recorded with a pending delivery to each
+    of `sink_names`; pairs no longer flagged are removed from the state. The
+    pending deliveries (new or left by an earlier failure, at the current
+    level) are returned with their details and a `sink` column, and are
+    cleared by mark_delivered(). The first evaluation of a state database
+    records every current level as the baseline and returns no alerts.
+    """
+    current = _flagged_rows(df, status_frames)
+    con = connect(path)
+    try:
+        previous = pd.read_sql_query("SELECT id, process, level AS previous_level FROM alert_state", con)
+        baseline = con.execute("SELECT 1 FROM alert_baseline").fetchone() is not None
+        if not baseline and previous.empty:
+            with con:
+                _upsert_levels(con, current)
+                con.execute("INSERT INTO alert_baseline (recorded_at) VALUES (?)", (datetime.now().isoformat(),))
+            logger.info("Primera evaluación de alertas: %d casos registrados como línea base, sin enviar",
+                        len(current))
+            return current.iloc[:0], current.iloc[:0].assign(sink='')
+
+        merged = current.merge(previous, on=['id', 'process'], how='left')
+        alerts = merged[merged['level'] != merged['previous_level']].drop(columns='previous_level')
+
+        # Only the differences are written: cleared pairs are removed, new levels queued for every sink
+        cleared = previous.merge(current[['id', 'process']], on=['id', 'process'], how='left', indicator=True)
+        cleared = cleared[cleared['_merge'] == 'left_only'][['id', 'process']]
+        with con:
+            for table in ('alert_state', 'alert_pending'):
+                con.executemany(f"DELETE FROM {table} WHERE id = ? AND process = ?",
+                                cleared.itertuples(index=False, name=None))
+            _upsert_levels(con, alerts)
+            con.executemany("INSERT OR REPLACE INTO alert_pending (id, process, level, sink) VALUES (?, ?, ?, ?)",
+                            [(*key, sink) for key in alerts[['id', 'process', 'level']].itertuples(index=False, name=None)
+                             for sink in sink_names])
+            if not baseline:
+                # State written before the baseline marker existed
+                con.execute("INSERT INTO alert_baseline (recorded_at) VALUES (?)", (datetime.now().isoformat(),))
+        pending = pd.read_sql_query("SELECT id, process, level, sink FROM alert_pending", con)
+    finally:
+        con.close()
+    # A delivery left at an earlier level was superseded by the alert of the current one
+    pending = current.merge(pending[pending['sink'].isin(list(sink_names))], on=['id', 'process', 'level'])
+    return alerts, pending
+
+
+def mark_delivered(deliveries, path=ALERT_STATE_FILE):
+    """Clear pending deliveries that reached their sink, so they are not sent again"""
+    if deliveries.empty:
+        return
+    con = connect(path)
+    try:
+        with con:
+            con.executemany("DELETE FROM alert_pending WHERE id = ? AND process = ? AND sink = ?",
+                            deliveries[['id', 'process', 'sink']].itertuples(index=False, name=None))
+    finally:
+        con.close()
+
+
+def build_digests(alerts, today):
+    """One digest per executive: overdue and soon-due cases, most urgent first"""
+    digests = []
+    alerts = alerts.sort_values(['Días Restantes', 'process', 'id'])
+    for executive, group in alerts.groupby('Ejecutivo', sort=True):
+        items = group.rename(columns={'id': 'ID', 'process': 'Proceso'}).drop(columns=['Ejecutivo'])
+        items = items.astype(object).where(items.notna(), None)  # JSON null rather than NaN
+        digests.append({
+            'ejecutivo': executive,
+            'fecha': today.isoformat(),
+            'vencidos': items[items['level'] == OVERDUE].drop(columns='level').to_dict('records'),
+            'por_vencer': items[items['level'] == DUE_SOON].drop(columns='level').to_dict('records'),
+        })
+    return digests
+
+
+def digest_text(digest):
+    """Plain-text body of a digest, for e-mail"""
+    lines = [f"Alertas de seguimiento del {digest['fecha']} para {digest['ejecutivo']}", ""]
+    for title, items in (("Vencidos", digest['vencidos']), ("Por vencer", digest['por_vencer'])):
+        if not items:
+            continue
+        lines.append(f"{title} ({len(items)}):")
+        lines.extend(f"  - {item['Proceso']}: ID {item['ID']}, {item['Cliente']}, póliza {item['Pólizas'] or 's/n'}, "
+                     f"{item['Estado']} (fecha base {item['Fecha Base']})" for item in items)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _json_value(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return str(value)
+
+
+class FileSink:
+    """Appends each digest as a JSON line to a daily file (alertas/AAAAMMDD.jsonl)"""
+    name = 'archivo'
+
+    def __init__(self, directory=ALERT_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _write(self, digest):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, digest['fecha'].replace('-', '') + '.jsonl')
+        line = json.dumps(digest, default=_json_value, ensure_ascii=False)
+        with self._lock, open(path, 'a', encoding='utf-8') as output:
+            output.write(line + "\n")
+
+    async def send(self, digest):
+        await asyncio.to_thread(self._write, digest)
+        return True
+
+
+class SmtpSink:
+    """E-mails each digest to its executive's address (a local relay by default)
+
+    Addresses come from a JSON file mapping executive names to e-mails;
+    executives without an address are skipped.
+    """
+    name = 'smtp'
+
+    def __init__(self, host=ALERT_SMTP_HOST, port=ALERT_SMTP_PORT, sender=ALERT_SENDER, recipients=None):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = load_recipients() if recipients is None else recipients
+
+    def _deliver(self, message):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            smtp.send_message(message)
+
+    async def send(self, digest):
+        address = self.recipients.get(digest['ejecutivo'])
+        if not address:
+            return False
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = address
+        message['Subject'] = (f"Seguimiento de daños: {len(digest['vencidos'])} vencidos, "
+                              f"{len(digest['por_vencer'])} por vencer")
+        message.set_content(digest_text(digest))
+        await asyncio.to_thread(self._deliver, message)
+        return True
+
+
+class WebhookSink:
+    """POSTs each digest as JSON to a URL"""
+    name = 'webhook'
+
+    def __init__(self, url=ALERT_WEBHOOK_URL, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, body):
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json; charset=utf-8'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def send(self, digest):
+        body = json.dumps(digest, default=_json_value, ensure_ascii=False).encode('utf-8')
+        await asyncio.to_thread(self._post, body)
+        return True
+
+
+SINKS = {'archivo': FileSink, 'smtp': SmtpSink, 'webhook': WebhookSink}
+
+
+def load_recipients(path=ALERT_RECIPIENTS_FILE):
+    """Executive name -> e-mail address, from a JSON file (empty when it does not exist)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def configured_sinks(names=ALERT_SINKS):
+    """Sinks named in a comma-separated list (ALERT_SINKS by default)"""
+    sinks = []
+    for name in (name.strip() for name in names.split(',')):
+        if not name:
+            continue
+        if name not in SINKS:
+            logger.warning("Destino de alertas desconocido: %s", name)
+            continue
+        if name == 'webhook' and not ALERT_WEBHOOK_URL:
+            logger.warning("ALERT_WEBHOOK_URL no está definido; se omite el webhook")
+            continue
+        sinks.append(SINKS[name]())
+    return sinks
+
+
+async def dispatch(jobs, concurrency=ALERT_CONCURRENCY):
+    """Send (sink, digest) pairs concurrently
+
+    Returns the digests sent per sink and the (sink name, executive) pairs
+    whose send raised; a sink may also skip a digest, e.g. without an address.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def deliver(sink, digest):
+        async with semaphore:
+            return await sink.send(digest)
+
+    results = await asyncio.gather(*(deliver(sink, digest) for sink, digest in jobs), return_exceptions=True)
+    sent = {}
+    failed = set()
+    for (sink, digest), result in zip(jobs, results):
+        sent.setdefault(sink.name, 0)
+        if isinstance(result, Exception):
+            logger.warning("No se pudo enviar la alerta de %s por %s: %s", digest['ejecutivo'], sink.name, result)
+            failed.add((sink.name, digest['ejecutivo']))
+        elif result:
+            sent[sink.name] += 1
+    return sent, failed
+
+
+async def run_alerts(df, status_frames, today, sinks=None, path=ALERT_STATE_FILE):
+    """Evaluate the data, send each sink its pending digests and clear the delivered ones"""
+    sinks = configured_sinks() if sinks is None else sinks
+    alerts, pending = await asyncio.to_thread(evaluate, df, status_frames, path, [sink.name for sink in sinks])
+    jobs = [(sink, digest) for sink in sinks
+            for digest in build_digests(pending[pending['sink'] == sink.name].drop(columns='sink'), today)]
+    sent, failed = await dispatch(jobs) if jobs else ({}, set())
+    delivered = [(sink, executive) not in failed for sink, executive in zip(pending['sink'], pending['Ejecutivo'])]
+    await asyncio.to_thread(mark_delivered, pending[delivered], path)
+    with _lock:
+        _last_run.update({
+            'evaluated_at': datetime.now(),
+            'alerts': len(alerts),
+            'executives': alerts['Ejecutivo'].nunique(),
+            'sent': sent,
+            'failed': len(failed),
+        })
+    return sent
+
+
+def _event_loop():
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="alert-dispatch", daemon=True).start()
+        return _loop
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Error al evaluar las alertas", exc_info=future.exception())
+
+
+def check_alerts(version, df, status_frames, today, sinks=None, path=ALERT_STATE_FILE):
+    """Submit an evaluation once per data version and day; returns immediately
+
+    Returns the concurrent.futures.Future of the run, or None when this
+    version and day were already submitted or no sink is configured.
+    """
+    key = (version, today, path)
+    with _lock:
+        if key in _checked:
+            return None
+        _checked.add(key)
+    sinks = configured_sinks() if sinks is None else sinks
+    if not sinks:
+        return None
+    future = asyncio.run_coroutine_threadsafe(run_alerts(df, status_frames, today, sinks, path), _event_loop())
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def last_run():
+    """Summary of the latest evaluation, for the instrumentation view (empty before the first)"""
+    with _lock:
+        return dict(_last_run)
+
+
+if __name__ == "__main__":
+    from engine import get_dataset, get_status_frames
+
+    logging.basicConfig(level=logging.INFO)
+    version, df = get_dataset()
+    today = datetime.now().date()
+    sent = asyncio.run(run_alerts(df, get_status_frames(version, df, today), today))
+    summary = last_run()
+    print(f"{summary['alerts']} alertas nuevas para {summary['executives']} ejecutivos; enviadas: {sent}")
@@ -0,0 +1,323 @@
+"""JSON API over the same records and summaries the dashboard shows.
+
+The server runs in a daemon thread of the dashboard process (started from
+main() when API_PORT is set), so it reads the same in-memory dataset, status frames, KPI cube and
+result cache; results computed for one are reused by the other. It can also
+be run on its own with `python api.py` for local testing.
+
+Endpoints (GET):
+    /api/periodos      registered periods with their current bounds
+    /api/procesos      processes (base column -> executive action column)
+    /api/registros     records per process, as in "Detalle por Proceso"
+    /api/resumen       executive summary, as in "Resumen Global"
+
+Records and summaries take the dashboard filters as query parameters:
+periodo (a period name) or desde/hasta (YYYY-MM-DD), and ejecutivo, ramo
+and moneda, each repeatable. /api/registros also takes proceso (a base
+column; all processes when omitted), pendientes=1 for pending records only,
+and pagina/por_pagina for pagination. /api/resumen takes nivel=siniestro
+(each claim once, the default) or nivel=proceso (each claim and process)
+and also returns the global counts. Every response carries an ETag derived
+from the data version, the day and the query; a matching If-None-Match gets
+304 Not Modified without recomputing anything.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from cache import result_cache
+from engine import PROCESSES, get_dataset, get_filter_index, get_kpi_cube, get_status_frames, query_kpi_cube
+from periods import PERIODS, resolve_period
+from prefetch import view_filters
+
+API_HOST = os.environ.get('API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('API_PORT') or 0)  # unset or 0: the dashboard does not serve the API
+STANDALONE_PORT = 8502  # `python api.py` without API_PORT
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_server = None
+_bind_failed = False
+
+# Fields of /api/registros; the color columns behind the table styling stay internal
+RECORD_FIELDS = ['ID', 'Cliente', 'Pólizas', 'Fecha Base', 'Fecha Ejecutivo', 'Estado Tiempo', 'Ejecutivo',
+                 'PrimaNeta', 'Moneda', 'SRamoNombre', 'Status', 'Proceso']
+
+
+class BadRequest(ValueError):
+    """Invalid query parameters, answered with 400"""
+
+
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def _date_param(query, name):
+    try:
+        return datetime.strptime(_param(query, name), '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise BadRequest(f"'{name}' debe tener el formato AAAA-MM-DD")
+
+
+def _int_param(query, name, default, low, high):
+    try:
+        value = int(_param(query, name, default))
+    except ValueError:
+        raise BadRequest(f"'{name}' debe ser un número entero")
+    if not low <= value <= high:
+        raise BadRequest(f"'{name}' debe estar entre {low} y {high}")
+    return value
+
+
+def _view(query):
+    """(view period, filters) from the query, in the form the dashboard uses for its cache keys"""
+    if 'desde' in query or 'hasta' in query:
+        start = _date_param(query, 'desde')
+        end = _date_param(query, 'hasta').replace(hour=23, minute=59, second=59)
+        if end < start:
+            raise BadRequest("'hasta' es anterior a 'desde'")
+        period = (start, end)
+    else:
+        period = _param(query, 'periodo', next(iter(PERIODS)))
+        if period not in PERIODS:
+            raise BadRequest(f"Período desconocido: {period}")
+    filters = view_filters(query.get('ejecutivo'), query.get('ramo'), query.get('moneda'))
+    return period, filters
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} no es serializable")
+
+
+def _rows(frame):
+    """A DataFrame as a list of JSON-ready dicts (missing values as null)"""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [dict(zip(frame.columns, row)) for row in frame.itertuples(index=False, name=None)]
+
+
+def _view_records(period, filters):
+    """Records of every process for a view, through the dashboard's result cache"""
+    import dashboard  # imported here because dashboard imports this module
+
+    version, df = get_dataset()
+    status_frames = get_status_frames(version, df)
+    filter_index = get_filter_index(version, df)
+    scope = (version, datetime.now().date())
+    records = result_cache.get_or_compute(
+        scope + ('records', period, filters),
+        lambda: dashboard.compute_view_records(df, period, filters, status_frames, filter_index)
+    )
+    return version, df, scope, records
+
+
+def records_response(query):
+    period, filters = _view(query)
+    process = _param(query, 'proceso')
+    if process is not None and process not in PROCESSES:
+        raise BadRequest(f"Proceso desconocido: {process}")
+    pending_only = _param(query, 'pendientes', '0') in ('1', 'true', 'si')
+    page = _int_param(query, 'pagina', 1, 1, 10 ** 9)
+    page_size = _int_param(query, 'por_pagina', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+
+    def build():
+        import dashboard
+
+        _, _, _, records = _view_records(period, filters)
+        frames = []
+        for base_column in ([process] if process else PROCESSES):
+            frame = records[base_column]
+            if frame.empty:
+                continue
+            if pending_only:
+                frame = frame[frame['Color Priority'].isin(['yellow', 'red']).to_numpy(dtype=bool)]
+            frames.append(frame.assign(Proceso=base_column))
+        combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RECORD_FIELDS)
+        total = len(combined)
+        page_records = combined.iloc[(page - 1) * page_size:page * page_size]
+        return {
+            'total': total,
+            'pagina': page,
+            'por_pagina': page_size,
+            'paginas': math.ceil(total / page_size),
+            'registros': _rows(dashboard.record_labels(page_records)[RECORD_FIELDS]),
+        }
+    return build
+
+
+SUMMARY_LEVELS = {'siniestro': False, 'proceso': True}
+
+
+def summary_response(query):
+    period, filters = _view(query)
+    level = _param(query, 'nivel', 'siniestro')
+    if level not in SUMMARY_LEVELS:
+        raise BadRequest(f"Nivel desconocido: {level} (siniestro o proceso)")
+    per_process = SUMMARY_LEVELS[level]
+
+    def build():
+        import dashboard
+
+        version, df, scope, records = _view_records(period, filters)
+        process_frames = [frame for frame in records.values() if not frame.empty]
+        if not process_frames:
+            return {'nivel': level, 'total': 0, 'completados': 0, 'pendientes': 0, 'ejecutivos': []}
+        # Same cache entries and cube shortcut as the "Resumen Global" tab
+        key = (period, filters) + (('proceso',) if per_process else ())
+        kpi_cells = None
+        if not isinstance(period, tuple):
+            kpi_cells = query_kpi_cube(get_kpi_cube(version, df), *dashboard.get_period_bounds(period),
+                                       filters[0], filters[2], filters[1], per_process=per_process)
+        if kpi_cells is not None:
+            total = int(kpi_cells['Casos'].sum())
+            completed = int(kpi_cells['Completados'].sum())
+            totals = {'Total': total, 'Completados': completed, 'Pendientes': total - completed}
+            summary = result_cache.get_or_compute(
+                scope + ('summary',) + key, lambda: dashboard.create_executive_summary_from_cube(kpi_cells)
+            )
+        else:
+            totals, summary = result_cache.get_or_compute(
+                scope + ('global',) + key, lambda: dashboard.summarize_process_records(process_frames, per_process)
+            )
+        return {
+            'nivel': level,
+            'total': totals['Total'],
+            'completados': totals['Completados'],
+            'pendientes': totals['Pendientes'],
+            'ejecutivos': _rows(summary.reset_index()),
+        }
+    return build
+
+
+def periods_response(query):
+    def build():
+        periods = []
+        for name in PERIODS:
+            start, end, label = resolve_period(name)
+            periods.append({'periodo': name, 'desde': start.date(), 'hasta': end.date(), 'etiqueta': label})
+        return {'periodos': periods}
+    return build
+
+
+def processes_response(query):
+    def build():
+        return {'procesos': [{'proceso': base, 'columna_ejecutivo': exec_column}
+                             for base, exec_column in PROCESSES.items()]}
+    return build
+
+
+ROUTES = {
+    '/api/periodos': periods_response,
+    '/api/procesos': processes_response,
+    '/api/registros': records_response,
+    '/api/resumen': summary_response,
+}
+
+
+def _etag(path, query):
+    """Strong validator for a response: same data version, day and query, same body"""
+    version = get_dataset()[0]
+    key = (version, datetime.now().date().isoformat(), path, sorted(query.items()))
+    return '"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+
+
+def _matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "DanosAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path.rstrip('/'))
+        if route is None:
+            self._send_json(404, {'error': f"Ruta desconocida: {url.path}"})
+            return
+        query = parse_qs(url.query)
+        try:
+            build = route(query)
+            etag = _etag(url.path.rstrip('/'), query)
+            if _matches(self.headers.get('If-None-Match'), etag):
+                self._send(304, b'', etag)
+                return
+            body = json.dumps(build(), default=_json_value, ensure_ascii=False).encode('utf-8')
+        except BadRequest as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            logger.exception("Error en %s", self.path)
+            self._send_json(500, {'error': str(e)})
+            return
+        self._send(200, body, etag)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def start_api_server(host=API_HOST, port=API_PORT):
+    """Serve the API from a daemon thread, once per process; returns the server or None
+
+    A failed bind is not retried: reruns of this process keep running without the API.
+    """
+    global _server, _bind_failed
+    if not port:
+        return None
+    with _lock:
+        if _server is None:
+            if _bind_failed:
+                return None
+            try:
+                _server = ThreadingHTTPServer((host, port), ApiHandler)
+            except OSError as e:
+                # Another dashboard process on this machine already serves the API
+                _bind_failed = True
+                logger.warning("API no iniciada en %s:%s: %s", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="json-api", daemon=True).start()
+        return _server
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    port = API_PORT or STANDALONE_PORT
+    server = ThreadingHTTPServer((API_HOST, port), ApiHandler)
+    print(f"API en http://{API_HOST}:{port}/api/")
+    server.serve_forever()
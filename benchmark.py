@@ -0,0 +1,80 @@
+"""Measure the per-rerun filter -> process -> display path outside Streamlit.
+
+For each view (period or date range, with and without an executive filter)
+the benchmark runs what a dashboard rerun does on a cache miss: the records
+of the 7 processes, the combined records, the executive summary and, per
+process, the display table with its row styling. It reports the best wall time
+over the repetitions and the peak memory allocated during one rerun
+(tracemalloc).
+
+Usage: python benchmark.py [--repeat N] [--data reporte_danos.xlsx]
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+from datetime import datetime
+
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+from engine import PROCESSES, get_dataset, get_filter_index, get_status_frames  # noqa: E402
+from dashboard import compute_view_records, prepare_process_display, summarize_process_records  # noqa: E402
+
+
+def benchmark_views(df):
+    """Views to replay: a quarter and a half-year, for everyone and for the busiest executive"""
+    busiest = df['Ejecutivo'].value_counts().index[0]
+    first_base = min(df[base_column].min() for base_column in PROCESSES)
+    start = datetime(first_base.year, first_base.month, 1)
+    quarter = (start, datetime(start.year + (start.month + 2) // 12, (start.month + 2) % 12 + 1, 1))
+    half = (start, datetime(start.year + (start.month + 5) // 12, (start.month + 5) % 12 + 1, 1))
+    return [(period, filters) for period in (quarter, half) for filters in (((), (), ()), ((busiest,), (), ()))]
+
+
+def rerun(df, status_frames, filter_index, period, filters):
+    """One uncached rerun of a view; returns the number of rows displayed"""
+    records = compute_view_records(df, period, filters, status_frames, filter_index)
+    process_frames = [frame for frame in records.values() if not frame.empty]
+    if not process_frames:
+        return 0
+    summarize_process_records(process_frames)
+    rows = 0
+    for frame in process_frames:
+        display_df, styled_df = prepare_process_display(frame)
+        styled_df._compute()  # what st.dataframe does to a Styler before sending it
+        rows += len(display_df)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--data', default=None, help="data file (default: the dashboard's)")
+    args = parser.parse_args()
+
+    version, df = get_dataset(args.data) if args.data else get_dataset()
+    status_frames = get_status_frames(version, df)
+    filter_index = get_filter_index(version, df)
+    views = benchmark_views(df)
+
+    for period, filters in views:
+        rerun(df, status_frames, filter_index, period, filters)  # warm up lazy imports and label caches
+
+    print(f"{len(df)} registros, {len(views)} vistas, {args.repeat} repeticiones")
+    for period, filters in views:
+        elapsed = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            rows = rerun(df, status_frames, filter_index, period, filters)
+            elapsed.append(time.perf_counter() - started)
+        # Allocations are traced in a separate run so tracing does not inflate the timings
+        tracemalloc.start()
+        rerun(df, status_frames, filter_index, period, filters)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        label = f"{period[0]:%Y-%m-%d}..{period[1]:%Y-%m-%d} {filters[0][0] if filters[0] else 'Todos'}"
+        print(f"{label:<45} {rows:>6} filas  {min(elapsed) * 1000:8.1f} ms  pico {peak / 1024 ** 2:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
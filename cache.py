@@ -0,0 +1,143 @@
+"""Memory-bounded LRU/TTL cache for per-view results.
+
+A view is one combination of data version, day, period (or date range) and
+sidebar filters. Its process records, combined records, summaries and Excel
+exports are shared by every session and by the prefetch worker. Entries are
+sized when stored (DataFrame memory_usage(deep=True) with categorical
+dictionaries counted once, by their owner, and export byte lengths);
+the least recently used ones are evicted once the total passes the memory
+ceiling, and entries older than the TTL are dropped on access.
+
+The ceiling and TTL can be set through the RESULT_CACHE_MB and
+RESULT_CACHE_TTL_SECONDS environment variables.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+RESULT_CACHE_BYTES = int(float(os.environ.get('RESULT_CACHE_MB', 256)) * 1024 * 1024)
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_TTL_SECONDS', 6 * 3600))
+
+
+def _column_bytes(series):
+    # Categories are shared with the dataset and status frames; only the codes belong to the entry
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.nbytes
+    return int(series.memory_usage(deep=True, index=False))
+
+
+def result_bytes(value):
+    """Approximate memory held by a cached result (DataFrames, bytes or containers of them)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.index.memory_usage(deep=True)) + sum(_column_bytes(value[col]) for col in value.columns)
+    if isinstance(value, pd.Series):
+        return int(value.index.memory_usage(deep=True)) + _column_bytes(value)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(result_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(result_bytes(item) for item in value)
+    return 0
+
+
+class ResultCache:
+    """Thread-safe LRU mapping whose entries are evicted by total size and age"""
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES, ttl_seconds=RESULT_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self._entries = OrderedDict()  # key -> (value, size, stored_at), least recently used first
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        """The entry for key unless it has expired (which removes it); call with the lock held"""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[2] > self.ttl_seconds:
+            del self._entries[key]
+            self.bytes -= entry[1]
+            self.expirations += 1
+            entry = None
+        return entry
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._live(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value, or None, marking it as most recently used"""
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, evict=True):
+        """Store a value; returns False when it does not fit
+
+        With evict=False nothing already cached is dropped to make room, which
+        keeps speculative entries from displacing ones users asked for.
+        """
+        size = result_bytes(value)
+        with self._lock:
+            if size > self.max_bytes:
+                return False
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            if not evict and self.bytes + size > self.max_bytes:
+                if previous is not None:
+                    self._entries[key] = previous
+                    self.bytes += previous[1]
+                return False
+            while self._entries and self.bytes + size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (value, size, time.monotonic())
+            self.bytes += size
+            return True
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def retain(self, keep):
+        """Drop every entry whose key does not satisfy keep(key)"""
+        with self._lock:
+            for key in [key for key in self._entries if not keep(key)]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        """Counters and memory use for the instrumentation view"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+result_cache = ResultCache()
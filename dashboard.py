@@ -1,152 +1,56 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
+from functools import lru_cache, partial
 from io import BytesIO
 
-# Page config - Force light theme
-st.set_page_config(
-    page_title="Control de Seguimiento de Daños", 
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-def load_data():
-    """Load and preprocess the Excel data"""
-    df = pd.read_excel("reporte_danos.xlsx")
-    
-    # Filter out cancelled registries (where Cancelaciones contains 'Si' in any case)
-    if 'Cancelaciones' in df.columns:
-        df = df[~df['Cancelaciones'].str.upper().str.strip().eq('SI')]
-    
-    # Clean executive names to remove trailing spaces
-    df['Ejecutivo'] = df['Ejecutivo'].str.strip()
-    
-    # Convert date columns to datetime
-    date_columns = ['FEnvío Cap', 'Carta cobertura', '30 Días Pres. Cliente', '69 Días Sol. Aseguradora',
-                   'Ejecutivo Fcap', 'Ejecutivo 5 días', 'Ejecutivo 30 días', 'Ejecutivo 69 días',
-                   '74 Días Recepcion de  Info. Del cliente', 'Ejecutivo 74 días ', '89 Días Env. Info, al cliente',
-                   'Ejecutivo 89 días', '100 Días Solicitud Siniestralidad', 'Ejecutivo 100 días']
-    for col in date_columns:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
-    
-    return df
-
-def get_week_range(date):
-    """Get the start and end of the week for a given date"""
-    start = date - timedelta(days=date.weekday())
-    end = start + timedelta(days=6)
-    return start, end
-
-def format_date_spanish(date):
-    """Convert date to Spanish format: '21 de julio'"""
-    spanish_months = {
-        1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
-        5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
-        9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
-    }
-    
-    day = date.day
-    month = spanish_months[date.month]
-    return f"{day} de {month}"
+from formatting import format_amounts, format_dates
+from alerts import check_alerts, last_run
+from api import start_api_server
+from cache import result_cache
+from engine import (FILTER_COLUMNS, PROCESSES, as_selection, compute_process_status, get_dataset, get_filter_index,
+                    get_kpi_cube, get_load_profile, get_status_frames, period_positions, prima_cents, query_kpi_cube,
+                    select_rows)
+from periods import PERIODS, resolve_period
+from prefetch import likely_views, record_selection, schedule, view_filters
+from history_store import first_snapshot_date, overdue_counts, record_daily_snapshot
+from trends import aging_histogram, completion_series, get_trend_aggregates, overdue_series
+
+PAGE_CSS_FILE = "style.css"
+
+# Process records keep dates and premiums typed; the tables label them with these formats, so they still sort as such
+DATE_FORMAT = '{:%d/%m/%Y}'
+AMOUNT_FORMATS = {True: ('${:,.2f}', '$0.00'), False: ('USD${:,.2f}', 'USD$0.00')}  # by Moneda == 'Nacional'
+EXCEL_DATE_FORMAT = 'DD/MM/YYYY'
+EXCEL_AMOUNT_FORMAT = '#,##0.00'
+
+# Dataset columns the process records are built from, besides the process dates
+RECORD_COLUMNS = ['ID', 'Cliente', 'Pólizas', 'Ejecutivo', 'PrimaNeta', 'Moneda', 'SRamoNombre']
+
+# Levels of the global view: per_process flag by label
+SUMMARY_LEVELS = {'Por siniestro': False, 'Por siniestro y proceso': True}
+
+# Uniform row styling in the process tables, by color priority
+PRIORITY_STYLES = {
+    'green': 'background-color: #dcfce7; color: #14532d; border-left: 4px solid #16a34a; font-weight: 600',
+    'yellow': 'background-color: #fef3c7; color: #92400e; border-left: 4px solid #d97706; font-weight: 600',
+    'red': 'background-color: #fee2e2; color: #991b1b; border-left: 4px solid #dc2626; font-weight: 600',
+}
 
 def get_period_range_spanish(period_type):
     """Get period range formatted in Spanish based on period type"""
-    today = datetime.now()
-    current_week_start, current_week_end = get_week_range(today)
-    
-    if period_type == "Semana en Curso":
-        start_str = format_date_spanish(current_week_start)
-        end_str = format_date_spanish(current_week_end)
-        return f"{start_str} al {end_str}"
-    elif period_type == "Semana Pasada":
-        past_week_start = current_week_start - timedelta(days=7)
-        past_week_end = current_week_start - timedelta(days=1)
-        start_str = format_date_spanish(past_week_start)
-        end_str = format_date_spanish(past_week_end)
-        return f"{start_str} al {end_str}"
-    elif period_type == "1 Semana Adelante":
-        future_week_start = current_week_end + timedelta(days=1)
-        future_week_end = future_week_start + timedelta(days=6)
-        start_str = format_date_spanish(future_week_start)
-        end_str = format_date_spanish(future_week_end)
-        return f"{start_str} al {end_str}"
-    elif period_type == "2 Semanas Pasadas":
-        two_weeks_past_start = current_week_start - timedelta(days=14)
-        two_weeks_past_end = current_week_start - timedelta(days=1)
-        start_str = format_date_spanish(two_weeks_past_start)
-        end_str = format_date_spanish(two_weeks_past_end)
-        return f"{start_str} al {end_str}"
-    elif period_type == "2 Semanas Adelante":
-        two_weeks_future_start = current_week_end + timedelta(days=1)
-        two_weeks_future_end = current_week_end + timedelta(days=14)
-        start_str = format_date_spanish(two_weeks_future_start)
-        end_str = format_date_spanish(two_weeks_future_end)
-        return f"{start_str} al {end_str}"
-    elif period_type == "Mes Pasado":
-        last_month = today.replace(day=1) - timedelta(days=1)
-        month_start = last_month.replace(day=1)
-        start_str = format_date_spanish(month_start)
-        end_str = format_date_spanish(last_month)
-        return f"{start_str} al {end_str}"
-    elif period_type == "Mes Actual":
-        month_start = today.replace(day=1)
-        next_month = month_start + timedelta(days=32)
-        month_end = next_month.replace(day=1) - timedelta(days=1)
-        start_str = format_date_spanish(month_start)
-        end_str = format_date_spanish(month_end)
-        return f"{start_str} al {end_str}"
-    elif period_type == "1 Mes Adelante":
-        next_month_start = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
-        month_after = next_month_start + timedelta(days=32)
-        next_month_end = month_after.replace(day=1) - timedelta(days=1)
-        start_str = format_date_spanish(next_month_start)
-        end_str = format_date_spanish(next_month_end)
-        return f"{start_str} al {end_str}"
-    else:  # Both weeks (legacy)
-        past_week_start = current_week_start - timedelta(days=7)
-        start_str = format_date_spanish(past_week_start)
-        end_str = format_date_spanish(current_week_end)
-        return f"{start_str} al {end_str}"
+    return resolve_period(period_type).label
+
+def get_period_bounds(period_type):
+    """Get the (start, end) datetimes of a period type, from midnight to 23:59:59"""
+    period = resolve_period(period_type)
+    return period.start, period.end
 
 def filter_by_period(df, period_type, base_column):
     """Filter dataframe by period type using specified base column"""
-    today = datetime.now()
-    current_week_start, current_week_end = get_week_range(today)
-
-    if period_type == "Semana en Curso":
-        start_date, end_date = current_week_start, current_week_end
-    elif period_type == "Semana Pasada":
-        start_date = current_week_start - timedelta(days=7)
-        end_date = current_week_start - timedelta(days=1)
-    elif period_type == "1 Semana Adelante":
-        start_date = current_week_end + timedelta(days=1)
-        end_date = start_date + timedelta(days=6)
-    elif period_type == "2 Semanas Pasadas":
-        start_date = current_week_start - timedelta(days=14)
-        end_date = current_week_start - timedelta(days=1)
-    elif period_type == "2 Semanas Adelante":
-        start_date = current_week_end + timedelta(days=1)
-        end_date = current_week_end + timedelta(days=14)
-    elif period_type == "Mes Pasado":
-        last_month = today.replace(day=1) - timedelta(days=1)
-        start_date = last_month.replace(day=1)
-        end_date = last_month
-    elif period_type == "Mes Actual":
-        start_date = today.replace(day=1)
-        next_month = start_date + timedelta(days=32)
-        end_date = next_month.replace(day=1) - timedelta(days=1)
-    elif period_type == "1 Mes Adelante":
-        start_date = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
-        month_after = start_date + timedelta(days=32)
-        end_date = month_after.replace(day=1) - timedelta(days=1)
-    else:  # Both weeks (legacy)
-        start_date = current_week_start - timedelta(days=7)
-        end_date = current_week_end
-    end_date = end_date.replace(hour=23, minute=59, second=59)
+    start_date, end_date = get_period_bounds(period_type)
     return df[(df[base_column] >= start_date) & (df[base_column] <= end_date)]
 
 def filter_by_date_range(df, start_date, end_date, base_column):
@@ -155,86 +59,48 @@ def filter_by_date_range(df, start_date, end_date, base_column):
 
 def get_missing_dates(df, column_pairs):
     """Get records with missing dates in executive columns based on column pairs"""
-    missing_data = []
-    
-    # Column mapping: base_column -> executive_column
-    column_mapping = {
-        'FEnvío Cap': 'Ejecutivo Fcap',
-        'Carta cobertura': 'Ejecutivo 5 días',
-        '30 Días Pres. Cliente': 'Ejecutivo 30 días',
-        '69 Días Sol. Aseguradora': 'Ejecutivo 69 días',
-        '74 Días Recepcion de  Info. Del cliente': 'Ejecutivo 74 días ',
-        '89 Días Env. Info, al cliente': 'Ejecutivo 89 días',
-        '100 Días Solicitud Siniestralidad': 'Ejecutivo 100 días'
-    }
-    
-    for idx, row in df.iterrows():
-        missing_actions = []
-        base_columns_used = []
-        
-        for base_col, exec_col in column_pairs.items():
-            if pd.isna(row[exec_col]):
-                missing_actions.append(exec_col)
-                base_columns_used.append(base_col)
-        
-        if missing_actions:
-            # Calculate days of delay
-            base_date = row[base_columns_used[0]] if base_columns_used else None
-            today = datetime.now()
-            
-            if pd.isna(base_date):
-                days_delay = "Sin fecha"
-            else:
-                days_delay = (today - base_date).days
-            
-            # Format base date for display
-            if pd.isna(base_date):
-                formatted_base_date = "Sin fecha"
-            else:
-                formatted_base_date = base_date.strftime('%d/%m/%Y') if pd.notnull(base_date) else "Sin fecha"
-            
-            missing_data.append({
-                'ID': int(row['ID']) if pd.notna(row['ID']) else 0,
-                'Cliente': row['Cliente'],
-                'Pólizas': row['Pólizas'],
-                'Fecha Base': formatted_base_date,
-                'SRamoNombre': row['SRamoNombre'],
-                'Ejecutivo': row['Ejecutivo'],
-                'Base Column': ', '.join(base_columns_used),
-                'PrimaNeta': row['PrimaNeta'],
-                'Días de Retraso': days_delay
-            })
-    
-    return pd.DataFrame(missing_data)
+    bases = list(column_pairs)
+    if not bases or df.empty:
+        return pd.DataFrame()
+    missing = np.column_stack([df[exec_col].isna().to_numpy() for exec_col in column_pairs.values()])
+    has_missing = missing.any(axis=1)
+    if not has_missing.any():
+        return pd.DataFrame()
+    rows = df[has_missing]
+    missing = missing[has_missing]
+
+    # Days of delay count from the base date of the first process with a missing action
+    first = missing.argmax(axis=1)
+    base_dates = np.column_stack([rows[base_col].to_numpy() for base_col in bases])
+    base_date = pd.Series(base_dates[np.arange(len(rows)), first])
+    days_delay = (pd.Timestamp(datetime.now()) - base_date).dt.days.astype('Int64').astype(object)
+
+    # One label per distinct combination of missing actions
+    patterns, codes = np.unique(missing, axis=0, return_inverse=True)
+    labels = np.array([', '.join(b for b, flag in zip(bases, pattern) if flag) for pattern in patterns], dtype=object)
+
+    return pd.DataFrame({
+        'ID': rows['ID'].fillna(0).astype(int).to_numpy(),
+        'Cliente': rows['Cliente'].array,
+        'Pólizas': rows['Pólizas'].array,
+        'Fecha Base': format_dates(base_date, "Sin fecha"),
+        'SRamoNombre': rows['SRamoNombre'].array,
+        'Ejecutivo': rows['Ejecutivo'].array,
+        'Base Column': labels[codes.ravel()],
+        'PrimaNeta': rows['PrimaNeta'].array,
+        'Días de Retraso': days_delay.where(base_date.notna(), "Sin fecha").to_numpy(),
+    })
 
 def create_executive_summary(df):
     """Create executive performance summary with enhanced metrics"""
     if df.empty:
         return pd.DataFrame()
 
-    # Create a copy for processing
-    df_copy = df.copy()
-
-    # Extract numeric value from PrimaNeta for aggregation
-    def extract_numeric_prima(prima_str):
-        if pd.isna(prima_str):
-            return 0.0
-        # Remove currency symbols and convert to float
-        numeric_str = str(prima_str).replace('USD$', '').replace('$', '').replace(',', '')
-        try:
-            return float(numeric_str)
-        except:
-            return 0.0
-
-    df_copy['PrimaNeta_numeric'] = df_copy['PrimaNeta'].apply(extract_numeric_prima)
+    # PrimaNeta rounded to cents, as displayed
+    prima_numeric = prima_cents(df['PrimaNeta']) / 100
 
     # Calculate timing statistics
-    timing_stats = df_copy.groupby('Ejecutivo')['Estado Tiempo'].value_counts().unstack(fill_value=0)
-
-    # Calculate completion statistics
-    completion_stats = df_copy.groupby('Ejecutivo')['Color Priority'].apply(
-        lambda x: (x == 'green').sum() / len(x) * 100
-    ).round(1)
+    timing_stats = df.groupby('Ejecutivo')['Estado Tiempo'].value_counts().unstack(fill_value=0)
 
     # Calculate average response time (only for completed cases)
     def calculate_avg_response_time(group):
@@ -275,15 +141,22 @@ def create_executive_summary(df):
 
         return round(np.mean(response_times), 1) if response_times else 0
 
+    # Row masks shared by every executive; each executive selects from them instead of copying rows
+    executives = df['Ejecutivo'].to_numpy()
+    completed = (df['Color Priority'] == 'green').to_numpy()
+    usd = (df['Moneda'] == 'Dólares').to_numpy()
+    nacional = (df['Moneda'] == 'Nacional').to_numpy()
+    clients = df['Cliente']
+
     # Group by executive and calculate all metrics
     summary_data = []
-    for exec_name in df_copy['Ejecutivo'].unique():
-        exec_data = df_copy[df_copy['Ejecutivo'] == exec_name]
+    for exec_name in df['Ejecutivo'].unique():
+        in_exec = executives == exec_name
 
         # Basic counts
-        total_cases = len(exec_data)
-        unique_clients = exec_data['Cliente'].nunique()
-        completed_cases = len(exec_data[exec_data['Color Priority'] == 'green'])
+        total_cases = int(in_exec.sum())
+        unique_clients = clients[in_exec].nunique()
+        completed_cases = int((in_exec & completed).sum())
         completion_rate = round((completed_cases / total_cases * 100), 1) if total_cases > 0 else 0
 
         # Timing statistics
@@ -293,11 +166,8 @@ def create_executive_summary(df):
         sin_fecha = timing_stats.get('Sin Fecha Base', {}).get(exec_name, 0)
 
         # Currency separation
-        usd_data = exec_data[exec_data['Moneda'] == 'Dólares']
-        nacional_data = exec_data[exec_data['Moneda'] == 'Nacional']
-
-        prima_usd = usd_data['PrimaNeta_numeric'].sum()
-        prima_nacional = nacional_data['PrimaNeta_numeric'].sum()
+        prima_usd = prima_numeric[in_exec & usd].sum()
+        prima_nacional = prima_numeric[in_exec & nacional].sum()
 
         # Average response time calculation (simplified)
         avg_response = 0  # Placeholder for now, complex to calculate without process context
@@ -319,232 +189,312 @@ def create_executive_summary(df):
 
     return summary_df.sort_values('Total Casos', ascending=False)
 
-def get_all_records_for_process(df, base_column, exec_column, selected_period, selected_executive, use_calendar=False, start_date=None, end_date=None):
-    """Get ALL records for a specific process with color coding"""
-    # Filter by period or date range
-    if use_calendar and start_date and end_date:
-        period_filtered = filter_by_date_range(df, start_date, end_date, base_column)
-    else:
-        period_filtered = filter_by_period(df, selected_period, base_column)
+def create_executive_summary_from_cube(cells):
+    """Create the executive summary from KPI cube cells instead of row-level data"""
+    if cells.empty:
+        return pd.DataFrame()
 
-    # Filter by executive if selected
-    if selected_executive != 'Todos':
-        period_filtered = period_filtered[period_filtered['Ejecutivo'] == selected_executive]
+    summary_data = []
+    # Executives in order of first appearance, as in the row-level summary
+    for exec_name, exec_cells in sorted(cells.groupby('Ejecutivo', dropna=False, sort=False),
+                                        key=lambda item: item[1]['Orden'].min()):
+        if pd.isna(exec_name):
+            # The row-level summary matches no rows for a missing executive (NaN != NaN): a row of zeros
+            exec_cells = exec_cells.iloc[:0]
+        total_cases = int(exec_cells['Casos'].sum())
+        completed_cases = int(exec_cells['Completados'].sum())
+        completion_rate = round((completed_cases / total_cases * 100), 1) if total_cases > 0 else 0
+        state_counts = exec_cells.groupby('Estado Tiempo')['Casos'].sum()
 
-    if period_filtered.empty:
-        return pd.DataFrame()
+        prima_usd = exec_cells.loc[exec_cells['Moneda'] == 'Dólares', 'Prima_cents'].sum() / 100
+        prima_nacional = exec_cells.loc[exec_cells['Moneda'] == 'Nacional', 'Prima_cents'].sum() / 100
 
-    # Process ALL records (not just missing ones)
-    today = datetime.now().date()  # Use date only, ignore time
-    processed_data = []
+        summary_data.append({
+            'Ejecutivo': exec_name,
+            'Total Casos': total_cases,
+            'Clientes Únicos': exec_cells.loc[exec_cells['Cliente'] >= 0, 'Cliente'].nunique(),
+            'En Tiempo': int(state_counts.get('En Tiempo', 0)),
+            'Retrasadas': int(state_counts.get('Retrasado', 0)),
+            'Pendientes': int(state_counts.get('Pendiente', 0) + state_counts.get('Sin Fecha Base', 0)),
+            '% Completado': completion_rate,
+            'Prima USD': f"${prima_usd:,.2f}" if prima_usd > 0 else "$0.00",
+            'Prima Nacional': f"${prima_nacional:,.2f}" if prima_nacional > 0 else "$0.00"
+        })
 
-    for idx, row in period_filtered.iterrows():
-        base_date = row[base_column]
-        exec_date = row[exec_column]
+    summary_df = pd.DataFrame(summary_data)
+    summary_df = summary_df.set_index('Ejecutivo')
 
-        # Determine timing status for new column
-        if pd.notna(exec_date) and pd.notna(base_date):
-            if exec_date.date() <= base_date.date():
-                timing_status = "En Tiempo"
-                timing_color = "green"
-            else:
-                timing_status = "Retrasado"
-                timing_color = "red"
-        elif pd.notna(exec_date) and pd.isna(base_date):
-            timing_status = "Sin Fecha Base"
-            timing_color = "yellow"
-        else:
-            timing_status = "Pendiente"
-            timing_color = "yellow"
-
-        # Calculate status and color coding (existing logic)
-        if pd.notna(exec_date):
-            # Green: Has executive action date
-            status = "Completado"
-            color_priority = "green"
-            formatted_exec_date = exec_date.strftime('%d/%m/%Y')
-        else:
-            # No executive action date
-            if pd.isna(base_date):
-                # Red: No base date available
-                status = "Sin fecha base"
-                color_priority = "red"
-                formatted_exec_date = "Sin acción"
-            else:
-                # Calculate days until deadline (using date only)
-                days_until_deadline = (base_date.date() - today).days
+    return summary_df.sort_values('Total Casos', ascending=False)
 
-                if days_until_deadline > 1:
-                    # Yellow: 3+ days remaining
-                    status = f"{days_until_deadline} días restantes"
-                    color_priority = "yellow"
-                else:
-                    # Red: Deadline today or overdue
-                    if days_until_deadline <= 0:
-                        status = f"{abs(days_until_deadline)} días vencido"
-                    else:
-                        status = "Vence hoy" if days_until_deadline == 0 else f"{days_until_deadline} día(s) restante(s)"
-                    color_priority = "red"
-
-                formatted_exec_date = "Pendiente"
-
-        # Format base date
-        formatted_base_date = base_date.strftime('%d/%m/%Y') if pd.notna(base_date) else "Sin fecha"
-
-        # Format PrimaNeta with currency symbol
-        currency = row.get('Moneda', 'Nacional')
-        currency_symbol = '$' if currency == 'Nacional' else 'USD$'
-        formatted_prima = f"{currency_symbol}{row['PrimaNeta']:,.2f}" if pd.notna(row['PrimaNeta']) else f"{currency_symbol}0.00"
-
-        processed_data.append({
-            'ID': int(row['ID']) if pd.notna(row['ID']) else 0,
-            'Cliente': row['Cliente'],
-            'Pólizas': row['Pólizas'],
-            'Fecha Base': formatted_base_date,
-            'Fecha Ejecutivo': formatted_exec_date,
-            'Estado Tiempo': timing_status,
-            'Ejecutivo': row['Ejecutivo'],
-            'PrimaNeta': formatted_prima,
-            'Moneda': currency,
-            'SRamoNombre': row['SRamoNombre'],
-            'Status': status,
-            'Color Priority': color_priority,
-            'Timing Color': timing_color
-        })
+def get_all_records_for_process(df, base_column, exec_column, selected_period, selected_executive, use_calendar=False, start_date=None, end_date=None, status_frames=None, filter_index=None, row_mask=None):
+    """Get ALL records for a specific process with color coding (period by binary search with a filter_index)"""
+    if not (use_calendar and start_date and end_date):
+        start_date, end_date = get_period_bounds(selected_period)
+
+    # Only the columns the records are built from are taken from the dataset
+    columns = [col for col in RECORD_COLUMNS if col in df.columns] + [base_column, exec_column]
+
+    positions = None
+    if filter_index is not None:
+        positions = period_positions(filter_index, base_column, start_date, end_date)
+        if row_mask is not None:
+            positions = positions[row_mask[positions]]
+        period_filtered = df.iloc[positions, df.columns.get_indexer(columns)]
+    else:
+        # Filter by period or date range
+        period_filtered = filter_by_date_range(df[columns], start_date, end_date, base_column)
+        if row_mask is not None:
+            period_filtered = period_filtered[row_mask[df.index.get_indexer(period_filtered.index)]]
 
-    return pd.DataFrame(processed_data)
+    # Filter by executive if selected
+    executives = as_selection(selected_executive)
+    if row_mask is None and executives is not None:
+        period_filtered = period_filtered[period_filtered['Ejecutivo'].isin(executives)]
 
+    if period_filtered.empty:
+        return pd.DataFrame()
+
+    # Status and color coding are looked up from the materialized frames (aligned with df by position)
+    if status_frames is not None and positions is not None and (row_mask is not None or executives is None):
+        status_df = status_frames[base_column].iloc[positions]
+    elif status_frames is not None:
+        status_df = status_frames[base_column].loc[period_filtered.index]
+    else:
+        status_df = compute_process_status(period_filtered, base_column, exec_column, datetime.now().date())
+
+    if 'Moneda' in period_filtered.columns:
+        currency = period_filtered['Moneda']
+    else:
+        currency = pd.Series('Nacional', index=period_filtered.index)
+
+    # Dates and premiums stay typed; they are labelled only where shown (process_table_style, record_labels)
+    return pd.DataFrame({
+        'ID': period_filtered['ID'].fillna(0).astype('int64').to_numpy(),
+        'Cliente': period_filtered['Cliente'].array,
+        'Pólizas': period_filtered['Pólizas'].array,
+        'Fecha Base': period_filtered[base_column].to_numpy(),
+        'Fecha Ejecutivo': period_filtered[exec_column].to_numpy(),
+        'Estado Tiempo': status_df['Estado Tiempo'].array,
+        'Ejecutivo': period_filtered['Ejecutivo'].array,
+        'PrimaNeta': period_filtered['PrimaNeta'].to_numpy(),
+        'Moneda': currency.array,
+        'SRamoNombre': period_filtered['SRamoNombre'].array,
+        'Status': status_df['Status'].array,
+        'Color Priority': status_df['Color Priority'].array,
+        'Timing Color': status_df['Timing Color'].array,
+    }, copy=False)
+
+def record_labels(records):
+    """Process records with dates and premiums as display strings: 'Sin fecha', 'Pendiente', 'Sin acción', $ or USD$"""
+    base_date = records['Fecha Base']
+    exec_date = records['Fecha Ejecutivo']
+    exec_label = format_dates(exec_date, "Pendiente")
+    exec_label[(exec_date.isna() & base_date.isna()).to_numpy()] = "Sin acción"
+    return records.assign(**{
+        'Fecha Base': format_dates(base_date, "Sin fecha"),
+        'Fecha Ejecutivo': exec_label,
+        'PrimaNeta': format_amounts(records['PrimaNeta'], records['Moneda']),
+    })
 
 def get_simple_counter(total_count):
     """Get simple counter without emojis or colors"""
     return f"{total_count}"
 
-def main():
-    # Custom CSS for modern, Material Design 3-inspired theme - FINAL POLISH
-    st.markdown("""
-    <style>
-    /* Import Google Font */
-    @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@400;500;700&display=swap');
-
-    /* --- Base & Typography --- */
-    html, body, .stApp, .main {
-        font-family: 'Roboto', sans-serif;
-        background-color: #f8f9fa; /* Light gray background */
-        color: #212529;
+def excel_bytes(df, columns=None):
+    """Excel workbook of a table (optionally some columns), in memory, with dates and premiums as values"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, columns=columns, index=False)
+        sheet = next(iter(writer.sheets.values()))
+        for position, col in enumerate(columns or df.columns, start=1):
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                number_format = EXCEL_DATE_FORMAT
+            elif col == 'PrimaNeta' and pd.api.types.is_numeric_dtype(df[col]):
+                number_format = EXCEL_AMOUNT_FORMAT
+            else:
+                continue
+            for (cell,) in sheet.iter_rows(min_row=2, min_col=position, max_col=position):
+                cell.number_format = number_format
+    return output.getvalue()
+
+def first_process_masks(process_frames):
+    """Per process frame, the rows whose ID appears there for the first time (in process order)"""
+    ids = pd.Series(np.concatenate([frame['ID'].to_numpy() for frame in process_frames]))
+    first = ~ids.duplicated().to_numpy()
+    bounds = np.cumsum([len(frame) for frame in process_frames])[:-1]
+    return np.split(first, bounds)
+
+def combine_process_records(process_frames):
+    """Records of every process with each ID kept once, at its first process"""
+    return pd.concat([frame[keep] for frame, keep in zip(process_frames, first_process_masks(process_frames))])
+
+def process_level_records(view_records):
+    """Records of every process, each (claim, process) once, with the process name"""
+    return pd.concat([frame.assign(Proceso=name) for name, frame in view_records.items() if not frame.empty])
+
+def summarize_process_records(process_frames, per_process=False):
+    """(totals, executive summary) of a view, counted from the process records without combining them"""
+    if not process_frames:
+        return {'Total': 0, 'Completados': 0, 'Pendientes': 0}, pd.DataFrame()
+    masks = [None] * len(process_frames) if per_process else first_process_masks(process_frames)
+
+    def gather(column):
+        return pd.concat([frame[column] if mask is None else frame[column][mask]
+                          for frame, mask in zip(process_frames, masks)], ignore_index=True)
+
+    executives = gather('Ejecutivo')
+    priority = gather('Color Priority')
+    completed = (priority == 'green').to_numpy()
+    totals = {
+        'Total': len(executives),
+        'Completados': int(completed.sum()),
+        'Pendientes': int(priority.isin(['yellow', 'red']).sum()),
     }
+    if not len(executives):
+        return totals, pd.DataFrame()
+
+    # Executives in order of first appearance, as the row-level summary lists them before sorting
+    exec_codes, exec_names = pd.factorize(executives, use_na_sentinel=False)
+    size = len(exec_names)
+
+    def count(mask=None, weights=None):
+        codes = exec_codes if mask is None else exec_codes[mask]
+        if weights is not None and mask is not None:
+            weights = weights[mask]
+        return np.bincount(codes, weights=weights, minlength=size)
+
+    total_cases = count()
+    completed_cases = count(completed)
+    states = gather('Estado Tiempo')
+    state_counts = {state: count((states == state).to_numpy()) for state in ['En Tiempo', 'Retrasado', 'Pendiente', 'Sin Fecha Base']}
+
+    # Distinct (executive, client) pairs, by hashing rather than sorting
+    client_codes = pd.factorize(gather('Cliente'))[0]
+    has_client = client_codes >= 0
+    pairs = pd.unique(exec_codes[has_client].astype(np.int64) * (client_codes.max() + 1) + client_codes[has_client])
+    unique_clients = np.bincount(pairs // (client_codes.max() + 1), minlength=size)
+
+    cents = prima_cents(gather('PrimaNeta')).astype(np.float64)
+    currencies = gather('Moneda')
+    prima_usd = count((currencies == 'Dólares').to_numpy(), cents) / 100
+    prima_nacional = count((currencies == 'Nacional').to_numpy(), cents) / 100
 
-    h1, h2, h3 {
-        font-weight: 700;
-        color: #0d1b2a; /* Dark blue-gray for headers */
-    }
+    summary_data = []
+    for code, exec_name in enumerate(exec_names):
+        if pd.isna(exec_name):
+            # The row-level summary matches no rows for a missing executive (NaN != NaN): a row of zeros
+            row = dict.fromkeys(['total', 'clients', 'completed', 'En Tiempo', 'Retrasado', 'Pendiente',
+                                 'Sin Fecha Base', 'usd', 'nacional'], 0)
+        else:
+            row = {'total': int(total_cases[code]), 'clients': int(unique_clients[code]),
+                   'completed': int(completed_cases[code]), 'usd': prima_usd[code], 'nacional': prima_nacional[code]}
+            row.update({state: int(counts[code]) for state, counts in state_counts.items()})
+        completion_rate = round((row['completed'] / row['total'] * 100), 1) if row['total'] > 0 else 0
 
-    h1 { font-size: 2.25rem; }
-    h2 { font-size: 1.75rem; }
-    h3 { font-size: 1.25rem; margin-top: 1.5rem; margin-bottom: 1rem; }
+        summary_data.append({
+            'Ejecutivo': exec_name,
+            'Total Casos': row['total'],
+            'Clientes Únicos': row['clients'],
+            'En Tiempo': row['En Tiempo'],
+            'Retrasadas': row['Retrasado'],
+            'Pendientes': row['Pendiente'] + row['Sin Fecha Base'],
+            '% Completado': completion_rate,
+            'Prima USD': f"${row['usd']:,.2f}" if row['usd'] > 0 else "$0.00",
+            'Prima Nacional': f"${row['nacional']:,.2f}" if row['nacional'] > 0 else "$0.00"
+        })
 
-    /* --- Sidebar --- */
-    [data-testid="stSidebar"] {
-        background-color: #ffffff;
-        border-right: 1px solid #dee2e6;
-    }
+    summary_df = pd.DataFrame(summary_data)
+    summary_df = summary_df.set_index('Ejecutivo')
 
-    /* --- Main Content --- */
-    .main .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
+    return totals, summary_df.sort_values('Total Casos', ascending=False)
+
+def priority_styles(table, priorities):
+    """CSS for every cell of a process table, uniform per row by color priority"""
+    row_styles = priorities.map(PRIORITY_STYLES).to_numpy(dtype=object, na_value='')
+    return pd.DataFrame(np.repeat(row_styles[:, None], table.shape[1], axis=1), index=table.index, columns=table.columns)
+
+def process_table_style(table, priorities):
+    """Styler of a process table: rows colored by priority, dates and premiums labelled as in record_labels"""
+    no_base = table['Fecha Base'].isna().to_numpy()
+    nacional = np.asarray(table['Moneda'] == 'Nacional', dtype=bool)
+    styler = table.style.apply(priority_styles, axis=None, priorities=priorities)
+    styler.format(DATE_FORMAT, subset=['Fecha Base'], na_rep="Sin fecha")
+    styler.format(DATE_FORMAT, subset=(~no_base, ['Fecha Ejecutivo']), na_rep="Pendiente")
+    styler.format(DATE_FORMAT, subset=(no_base, ['Fecha Ejecutivo']), na_rep="Sin acción")
+    for is_nacional, (amount_format, missing) in AMOUNT_FORMATS.items():
+        styler.format(amount_format, subset=(nacional == is_nacional, ['PrimaNeta']), na_rep=missing)
+    return styler
+
+def prepare_process_display(process_df, search_term=""):
+    """Search-filtered table of a process without internal columns, plus its styler"""
+    if search_term:
+        mask = (process_df['Cliente'].str.contains(search_term, case=False, na=False) |
+                process_df['Pólizas'].str.contains(search_term, case=False, na=False))
+        process_df = process_df[mask.to_numpy(dtype=bool)]
+
+    # Remove internal columns from display
+    display_columns = [col for col in process_df.columns if col not in ['Color Priority', 'Timing Color']]
+    display_df = process_df[display_columns]
+    return display_df, process_table_style(display_df, process_df['Color Priority'])
+
+def compute_view_records(df, period, filters, status_frames, filter_index):
+    """Records of every process for one view (period name or (start, end) range), keyed by base column"""
+    use_calendar = isinstance(period, tuple)
+    start_date, end_date = period if use_calendar else (None, None)
+    selected_period = None if use_calendar else period
+    row_mask = select_rows(filter_index, dict(zip(FILTER_COLUMNS, filters)))
+    return {
+        process_name: get_all_records_for_process(
+            df, process_name, exec_column, selected_period, filters[0],
+            use_calendar, start_date, end_date, status_frames, filter_index, row_mask
+        )
+        for process_name, exec_column in PROCESSES.items()
     }
 
-    /* --- Card Design for Metric Containers --- */
-    [data-testid="metric-container"] {
-        background-color: #ffffff;
-        border-radius: 12px;
-        padding: 1.25rem;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
-        border: 1px solid #e9ecef;
-        transition: transform 0.2s ease-in-out, box-shadow 0.2s ease-in-out;
-    }
-    [data-testid="metric-container"]:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 8px 16px rgba(0,0,0,0.08);
-    }
+@lru_cache(maxsize=1)
+def page_style():
+    """The page CSS as a <style> block, read once per process from the bundled stylesheet"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), PAGE_CSS_FILE), encoding='utf-8') as source:
+        return f"<style>\n{source.read()}</style>"
 
-    /* --- Tabs --- */
-    [data-testid="stTabs"] {
-        border-bottom: 2px solid #dee2e6;
-    }
-    [data-testid="stTabs"] button {
-        font-weight: 600;
-        color: #495057;
-        padding: 0.75rem 1.25rem;
-        border-radius: 8px 8px 0 0;
-        transition: all 0.2s ease-in-out;
-        border: none;
-        background-color: transparent;
-    }
-    [data-testid="stTabs"] button[aria-selected="true"] {
-        background-color: #f8f9fa;
-        color: #005f73; /* Primary accent color */
-        border-bottom: 3px solid #005f73;
-    }
-    [data-testid="stTabs"] button:hover {
-        background-color: #e9ecef;
-    }
+def main():
+    # Page config - Force light theme (here rather than at import, so other modules can import this one)
+    st.set_page_config(
+        page_title="Control de Seguimiento de Daños", 
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
 
-    /* --- Expander/Accordion --- */
-    [data-testid="stExpander"] {
-        background-color: #ffffff;
-        border-radius: 12px;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
-        border: 1px solid #e9ecef;
-        margin-bottom: 0.05rem; /* Reduced spacing */
-        transition: box-shadow 0.2s ease-in-out;
-    }
-    [data-testid="stExpander"]:hover {
-        box-shadow: 0 8px 16px rgba(0,0,0,0.08);
-    }
-    [data-testid="stExpander"] summary {
-        font-weight: 600;
-        font-size: 1.1rem;
-        color: #0d1b2a;
-        padding: 1.25rem 1.5rem;
-    }
-    [data-testid="stExpander"] .streamlit-expanderContent {
-        padding: 0 1.5rem 1.5rem 1.5rem;
-    }
+    # JSON API for other tools, sharing this process's dataset and caches
+    start_api_server()
 
-    /* --- Table Styling --- */
-    .stDataFrame {
-        border-radius: 12px;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
-        border: 1px solid #e9ecef;
-        overflow: hidden;
-    }
-    .stDataFrame table {
-        width: 100%;
-    }
-    .stDataFrame thead th {
-        background-color: #f1f3f5;
-        color: #343a40;
-        font-weight: 600;
-        border-bottom: 2px solid #dee2e6;
-        padding: 0.75rem;
-    }
-    .stDataFrame tbody td {
-        padding: 0.75rem;
-    }
-    .stDataFrame tbody tr:nth-child(even) {
-        background-color: #f8f9fa;
-    }
+    # Custom CSS for modern, Material Design 3-inspired theme (local file, no remote fonts)
+    st.markdown(page_style(), unsafe_allow_html=True)
 
-    </style>
-    """, unsafe_allow_html=True)
+    # Title first, so the page shows up while the data loads after a restart
+    st.title("Control de Seguimiento")
     
     # Load data first (needed for filters)
     try:
-        df = load_data()
+        with st.spinner("Cargando datos..."):
+            data_version, df = get_dataset()
+            status_frames = get_status_frames(data_version, df)
+            kpi_cube = get_kpi_cube(data_version, df)
+            filter_index = get_filter_index(data_version, df)
+            trend_aggregates = get_trend_aggregates(data_version, df)
     except Exception as e:
         st.error(f"❌ Error al cargar datos: {e}")
         return
+
+    # Daily snapshot for the history store (only changed rows are written)
+    try:
+        record_daily_snapshot(data_version, df, status_frames, datetime.now().date())
+    except Exception as e:
+        st.warning(f"⚠️ No se pudo registrar el historial: {e}")
+
+    # Overdue alerts for executives, evaluated and delivered in the background
+    check_alerts(data_version, df, status_frames, datetime.now().date())
     
     # Sidebar filters
     st.sidebar.header("🔍 Filtros")
@@ -563,16 +513,20 @@ def main():
         start_date = datetime.combine(start_date, datetime.min.time())
         end_date = datetime.combine(end_date, datetime.min.time()).replace(hour=23, minute=59, second=59)
     else:
-        period_options = [
-            "Semana en Curso", "Semana Pasada", "1 Semana Adelante",
-            "2 Semanas Pasadas", "2 Semanas Adelante",
-            "Mes Pasado", "Mes Actual", "1 Mes Adelante"
-        ]
+        period_options = list(PERIODS)
         selected_period = st.sidebar.selectbox("📅 Período", period_options)
 
-    # Executive filter is now after the date/period filters
-    executives = ['Todos'] + sorted(df['Ejecutivo'].dropna().unique().tolist())
-    selected_executive = st.sidebar.selectbox("👤 Ejecutivo", executives)
+    # Executive, branch and currency filters are now after the date/period filters (empty = Todos)
+    selected_executive = st.sidebar.multiselect(
+        "👤 Ejecutivo", sorted(df['Ejecutivo'].dropna().unique().tolist()), placeholder="Todos"
+    )
+    selected_branches = st.sidebar.multiselect(
+        "🏷️ Ramo", sorted(df['SRamoNombre'].dropna().unique().tolist()), placeholder="Todos"
+    )
+    selected_currencies = st.sidebar.multiselect(
+        "💱 Moneda", sorted(df['Moneda'].dropna().unique().tolist()), placeholder="Todos"
+    )
+    filters = view_filters(selected_executive, selected_branches, selected_currencies)
 
     # Color legend explanation
     st.sidebar.markdown("---")
@@ -583,9 +537,7 @@ def main():
     - 🔴 **Rojo**: Casos vencidos o que vencen hoy
     """)
     
-    # Dynamic title based on selection
-    st.title("Control de Seguimiento")
-
+    # Dynamic subtitle based on selection
     if use_calendar and start_date and end_date:
         period_range_text = f"{start_date.strftime('%d/%m/%Y')} al {end_date.strftime('%d/%m/%Y')}"
     elif selected_period:
@@ -599,42 +551,60 @@ def main():
     st.success(f"Datos cargados: {len(df)} registros")
 
     # Process definitions - all processes displayed
-    processes = {
-        'FEnvío Cap': 'Ejecutivo Fcap',
-        'Carta cobertura': 'Ejecutivo 5 días',
-        '30 Días Pres. Cliente': 'Ejecutivo 30 días',
-        '69 Días Sol. Aseguradora': 'Ejecutivo 69 días',
-        '74 Días Recepcion de  Info. Del cliente': 'Ejecutivo 74 días ',
-        '89 Días Env. Info, al cliente': 'Ejecutivo 89 días',
-        '100 Días Solicitud Siniestralidad': 'Ejecutivo 100 días'
-    }
+    processes = PROCESSES
+
+    # Records of the current view, shared through the view cache (possibly warmed by the prefetch worker)
+    def compute_view(period, view):
+        return compute_view_records(df, period, view, status_frames, filter_index)
+
+    view_scope = (data_version, datetime.now().date())
+    view_period = (start_date, end_date) if use_calendar else selected_period
+
+    def view_key(kind, *extra):
+        return view_scope + (kind, view_period, filters) + extra
+
+    view_records = result_cache.get_or_compute(view_key('records'), lambda: compute_view(view_period, filters))
 
     # First, collect all data for global summary
-    all_process_data = []
-    for process_name, exec_column in processes.items():
-        process_data = get_all_records_for_process(
-            df, process_name, exec_column, selected_period, selected_executive,
-            use_calendar, start_date, end_date
-        )
-        if not process_data.empty:
-            all_process_data.append(process_data)
+    all_process_data = [process_data for process_data in view_records.values() if not process_data.empty]
     
-    # Create two tabs for better organization
-    tab1, tab2 = st.tabs(["Resumen Global", "Detalle por Proceso"])
+    # Create tabs for better organization
+    tab1, tab2, tab3 = st.tabs(["Resumen Global", "Detalle por Proceso", "Tendencias"])
 
     with tab1:
         # Executive summary section (cleaned up layout)
         if all_process_data:
-            # Combine all process data for summary
-            combined_df = pd.concat(all_process_data).drop_duplicates(subset=['ID'])
-            
+            # Each claim once (at its first process in the period) or each (claim, process) record
+            summary_level = st.radio("Nivel del resumen", list(SUMMARY_LEVELS), horizontal=True,
+                                     key="summary_level")
+            per_process = SUMMARY_LEVELS[summary_level]
+            level_key = ('proceso',) if per_process else ()
+
+            # Global metrics come from the KPI cube when the period lines up with its buckets
+            kpi_cells = None
+            if not use_calendar:
+                kpi_cells = query_kpi_cube(kpi_cube, *get_period_bounds(selected_period), selected_executive,
+                                           selected_currencies, selected_branches, per_process=per_process)
+
             # Executive Performance Summary
             st.subheader("👤 Resumen por Ejecutivo")
 
             # Global statistics as small text below the title
-            total_records = len(combined_df)
-            completed_records = len(combined_df[combined_df['Color Priority'] == 'green'])
-            pending_records = len(combined_df[combined_df['Color Priority'].isin(['yellow', 'red'])])
+            if kpi_cells is not None:
+                total_records = int(kpi_cells['Casos'].sum())
+                completed_records = int(kpi_cells['Completados'].sum())
+                pending_records = total_records - completed_records
+                executive_summary = result_cache.get_or_compute(
+                    view_key('summary', *level_key), lambda: create_executive_summary_from_cube(kpi_cells)
+                )
+            else:
+                # Aggregated straight from the process records, without a combined frame
+                totals, executive_summary = result_cache.get_or_compute(
+                    view_key('global', *level_key), lambda: summarize_process_records(all_process_data, per_process)
+                )
+                total_records = totals['Total']
+                completed_records = totals['Completados']
+                pending_records = totals['Pendientes']
 
             # Calculate global percentages
             completion_percentage = round((completed_records / total_records * 100), 1) if total_records > 0 else 0
@@ -651,13 +621,13 @@ def main():
             with col3:
                 st.metric("Total Registros", total_records)
 
-            executive_summary = create_executive_summary(combined_df)
             st.dataframe(executive_summary, use_container_width=True)
 
-            # Global export with download button using BytesIO (no disk write)
-            output = BytesIO()
-            combined_df.to_excel(output, index=False, engine='openpyxl')
-            output.seek(0)
+            # Global export with download button (rows gathered and built in memory on click, no disk write)
+            export_records = (partial(process_level_records, view_records) if per_process
+                              else partial(combine_process_records, all_process_data))
+            output = partial(result_cache.get_or_compute, view_key('export', *level_key),
+                             lambda: excel_bytes(export_records()))
 
             st.download_button(
                 label="Exportar",
@@ -672,10 +642,7 @@ def main():
         # Display each process in its own section (after global summary)
         for process_name, exec_column in processes.items():
             # Get ALL data for this specific process to get the count for the expander title
-            process_all_df = get_all_records_for_process(
-                df, process_name, exec_column, selected_period, selected_executive,
-                use_calendar, start_date, end_date
-            )
+            process_all_df = view_records[process_name]
             
             # Create the title with the count in a subtle way
             expander_title = f"📋 {process_name}  |  {len(process_all_df)} registros"
@@ -691,43 +658,13 @@ def main():
                         key=search_key
                     )
                     
-                    display_df = process_all_df.copy()
-                    if search_term:
-                        mask = (display_df['Cliente'].str.contains(search_term, case=False, na=False) | 
-                                display_df['Pólizas'].str.contains(search_term, case=False, na=False))
-                        display_df = display_df[mask]
-                    
-                    # Remove internal columns from display
-                    display_columns = [col for col in display_df.columns if col not in ['Color Priority', 'Timing Color']]
-                    display_df_clean = display_df[display_columns].copy()
-
-                    # Create color mapping based on original data
-                    color_mapping = display_df['Color Priority'].to_dict()
-                    timing_color_mapping = display_df['Timing Color'].to_dict()
-
-                    # Apply styling using the color mapping - Uniform row colors
-                    def highlight_by_priority(row):
-                        # Get the color priority from the mapping using the row's index
-                        color_priority = color_mapping.get(row.name, '')
-
-                        # Apply uniform styling to entire row based on overall priority
-                        if color_priority == 'green':
-                            return ['background-color: #dcfce7; color: #14532d; border-left: 4px solid #16a34a; font-weight: 600'] * len(row)
-                        elif color_priority == 'yellow':
-                            return ['background-color: #fef3c7; color: #92400e; border-left: 4px solid #d97706; font-weight: 600'] * len(row)
-                        elif color_priority == 'red':
-                            return ['background-color: #fee2e2; color: #991b1b; border-left: 4px solid #dc2626; font-weight: 600'] * len(row)
-                        else:
-                            return [''] * len(row)
-
-                    styled_df = display_df_clean.style.apply(highlight_by_priority, axis=1)
+                    display_df_clean, styled_df = prepare_process_display(process_all_df, search_term)
                     st.dataframe(styled_df, use_container_width=True)
 
-                    # Export with download button using BytesIO (no disk write)
+                    # Export with download button (built in memory on click, no disk write)
                     safe_name = process_name.replace(' ', '_').replace(':', '')
-                    output = BytesIO()
-                    display_df_clean.to_excel(output, index=False, engine='openpyxl')
-                    output.seek(0)
+                    output = partial(result_cache.get_or_compute, view_key('export', process_name, search_term),
+                                     partial(excel_bytes, display_df_clean))
 
                     st.download_button(
                         label="Exportar",
@@ -736,6 +673,96 @@ def main():
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                         key=f"export_{process_name.replace(' ', '_')}"
                     )
+
+    with tab3:
+        # Plotly is the slowest import of the page, so it loads here, after the other tabs are sent
+        import plotly.express as px
+
+        # Trend charts read the incrementally maintained aggregates, not the raw rows
+        today = datetime.now().date()
+        if selected_branches or selected_currencies:
+            st.caption("Las tendencias aplican solo el filtro de ejecutivo")
+
+        st.subheader("📈 % Completado por Semana")
+        completion_df = completion_series(trend_aggregates, today, selected_executive)
+        if completion_df.empty:
+            st.info("No hay datos históricos para el ejecutivo seleccionado")
+        else:
+            fig = px.line(completion_df, x='Semana', y='% Completado', color='Ejecutivo', markers=True)
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("⏰ Registros Vencidos por Proceso")
+        overdue_df = overdue_series(trend_aggregates, today, selected_executive)
+        if overdue_df.empty:
+            st.info("No hay datos históricos para el ejecutivo seleccionado")
+        else:
+            fig = px.line(overdue_df, x='Semana', y='Vencidos', color='Proceso')
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("📊 Antigüedad de Pendientes Vencidos")
+        aging_df = aging_histogram(trend_aggregates, today, selected_executive)
+        if aging_df.empty or aging_df['Casos'].sum() == 0:
+            st.info("No hay registros pendientes vencidos")
+        else:
+            fig = px.bar(aging_df, x='Antigüedad', y='Casos', color='Proceso')
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.subheader("🗓️ Consulta Histórica")
+        first_date = first_snapshot_date()
+        if first_date is None:
+            st.info("Aún no hay historial registrado")
+        else:
+            last_monday = today - timedelta(days=today.weekday() or 7)
+            as_of = st.date_input("Fecha de consulta", value=max(last_monday, first_date),
+                                  min_value=first_date, max_value=today)
+            st.dataframe(overdue_counts(as_of, selected_executive).set_index('Proceso'), use_container_width=True)
+
+    # Warm the views users usually open next, after this one has rendered
+    record_selection(selected_period, filters)
+    schedule(view_scope, likely_views(filters), compute_view)
+
+    # Data-quality counts gathered while the data was loaded
+    profile = get_load_profile(data_version)
+    if profile is not None:
+        with st.sidebar.expander("🧪 Calidad de Datos", expanded=False):
+            st.markdown(
+                f"**Filas leídas:** {profile.rows} | **Canceladas:** {profile.cancelled} | "
+                f"**Cargadas:** {len(df)}"
+                + (f" | **Reemplazadas por otra fuente:** {profile.replaced}" if profile.replaced else "")
+            )
+            st.markdown(f"**ID faltantes:** {profile.missing_ids} | **ID repetidos:** {profile.duplicate_ids}")
+            st.markdown(f"**Primas no numéricas:** {profile.non_numeric_premiums}")
+            st.markdown(
+                "**Monedas desconocidas:** "
+                + (", ".join(f"'{value}' ({count})" for value, count in profile.unknown_currencies.items())
+                   or "ninguna")
+            )
+            st.markdown(
+                "**Fechas no válidas (quedan vacías):** "
+                + (", ".join(f"{column.strip()} ({count})" for column, count in profile.coerced_dates.items())
+                   or "ninguna")
+            )
+
+    # Result cache instrumentation, to size RESULT_CACHE_MB for production
+    with st.sidebar.expander("📊 Instrumentación", expanded=False):
+        stats = result_cache.stats()
+        st.markdown(
+            f"**Caché de resultados:** {stats['entries']} entradas, "
+            f"{stats['bytes'] / 1024 ** 2:.1f} de {stats['max_bytes'] / 1024 ** 2:.0f} MB"
+        )
+        st.markdown(
+            f"**Aciertos:** {stats['hits']} | **Fallos:** {stats['misses']} | "
+            f"**Tasa de aciertos:** {stats['hit_rate'] * 100:.1f}%"
+        )
+        st.markdown(f"**Expulsiones:** {stats['evictions']} | **Expiraciones:** {stats['expirations']}")
+        alerts_run = last_run()
+        if alerts_run:
+            st.markdown(
+                f"**Alertas:** {alerts_run['alerts']} nuevas para {alerts_run['executives']} ejecutivos "
+                f"({alerts_run['evaluated_at']:%H:%M}) | **Enviadas:** "
+                + (", ".join(f"{name} {count}" for name, count in alerts_run['sent'].items()) or "ninguna")
+                + (f" | **Sin enviar:** {alerts_run['failed']} (se reintentan)" if alerts_run['failed'] else "")
+            )
     
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+"""Run several dashboard workers behind a local load balancer.
+
+A single Streamlit process runs the script of every session in one
+interpreter, so concurrent reruns compete for the same GIL. This starts
+several Streamlit workers on consecutive local ports and a balancer on the
+public port:
+
+- Streamlit keeps each session, and the files it serves such as exports, in
+  the process that created it. The balancer therefore pins every browser to
+  one worker with a cookie; a new browser goes to the worker with the fewest
+  open connections.
+- Each forwarded request carries Connection: close, so every connection holds
+  a single request and is routed on its own. A session's websocket stays open
+  on its worker.
+- The workers share the prepared dataset through memory-mapped Arrow files
+  (SHARED_DATASET_DIR, see shared_dataset.py). The dataset is published before
+  they start, so none of them parses the Excel files on startup.
+- Only the first worker serves the JSON API and sends alerts.
+- A worker that exits is restarted. Its browsers move to another worker and
+  reconnect.
+
+Usage: python deploy.py [--trabajadores N] [--puerto 8501] [--puerto-trabajadores 8600] [--dir-compartido DIR]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import secrets
+import signal
+import subprocess
+import sys
+from http.cookies import CookieError, SimpleCookie
+
+WORKERS = int(os.environ.get('DASHBOARD_WORKERS', 0)) or os.cpu_count() or 1
+PORT = 8501
+WORKER_BASE_PORT = 8600
+SHARED_DIR = ".dataset_compartido"
+AFFINITY_COOKIE = "dashboard_worker"
+MAX_HEAD_BYTES = 64 * 1024
+PIPE_CHUNK_BYTES = 64 * 1024
+MONITOR_SECONDS = 2
+
+logger = logging.getLogger("deploy")
+
+
+class Worker:
+    """One Streamlit process on a local port"""
+
+    def __init__(self, number, port, env):
+        self.number = number
+        self.port = port
+        self.env = env
+        self.process = None
+        self.connections = 0
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', 'dashboard.py',
+             '--server.port', str(self.port), '--server.address', '127.0.0.1', '--server.headless', 'true'],
+            env=self.env,
+        )
+        logger.info("Trabajador %d iniciado en el puerto %d (pid %d)", self.number, self.port, self.process.pid)
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.alive:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def worker_env(number, shared_dir, cookie_secret):
+    """Environment of a worker: shared dataset and cookie secret; API, alerts and history snapshots only on the first"""
+    env = dict(os.environ, SHARED_DATASET_DIR=os.path.abspath(shared_dir),
+               STREAMLIT_SERVER_COOKIE_SECRET=cookie_secret)
+    if number:
+        env.update(API_PORT='0', ALERT_SINKS='', HISTORY_SNAPSHOTS='0')
+    return env
+
+
+def publish_dataset(shared_dir):
+    """Load the dataset once and publish it for the workers"""
+    os.environ['SHARED_DATASET_DIR'] = os.path.abspath(shared_dir)
+    import engine
+
+    version, df = engine.get_dataset()
+    logger.info("Dataset publicado en %s: %d registros", shared_dir, len(df))
+
+
+def _affinity(head):
+    """Worker number from the affinity cookie of a request head, or None"""
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() != b'cookie':
+            continue
+        cookie = SimpleCookie()
+        try:
+            cookie.load(value.decode('latin-1'))
+        except CookieError:
+            continue
+        if AFFINITY_COOKIE in cookie and cookie[AFFINITY_COOKIE].value.isdigit():
+            return int(cookie[AFFINITY_COOKIE].value)
+    return None
+
+
+def _request_head(head):
+    """Request head to forward: one request per connection unless it upgrades to a websocket"""
+    lines = head.split(b'\r\n')
+    upgrade = any(line.lower().startswith(b'upgrade:') for line in lines[1:])
+    if not upgrade:
+        lines = [line for line in lines if not line.lower().startswith(b'connection:')]
+        lines.insert(1, b'Connection: close')
+    return b'\r\n'.join(lines)
+
+
+async def _pipe(reader, writer):
+    try:
+        while chunk := await reader.read(PIPE_CHUNK_BYTES):
+            writer.write(chunk)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        if not writer.is_closing():
+            writer.close()
+
+
+async def _pipe_response(reader, writer, cookie):
+    """Copy the backend's response, adding the affinity cookie to its head"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        writer.close()
+        return
+    status, _, rest = head.partition(b'\r\n')
+    writer.write(status + b'\r\n' + cookie + b'\r\n' + rest)
+    await _pipe(reader, writer)
+
+
+class Balancer:
+    def __init__(self, workers):
+        self.workers = workers
+
+    def choose(self, preferred):
+        """The pinned worker if it is up, else the live worker with the fewest connections"""
+        if preferred is not None and 0 <= preferred < len(self.workers) and self.workers[preferred].alive:
+            return self.workers[preferred], False
+        live = [worker for worker in self.workers if worker.alive] or self.workers
+        return min(live, key=lambda worker: worker.connections), True
+
+    async def handle(self, client_reader, client_writer):
+        try:
+            head = await client_reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            client_writer.close()
+            return
+        worker, new_pin = self.choose(_affinity(head))
+        try:
+            backend_reader, backend_writer = await asyncio.open_connection('127.0.0.1', worker.port)
+        except OSError:
+            # Starting or restarting: let the browser retry
+            client_writer.write(b'HTTP/1.1 503 Service Unavailable\r\nConnection: close\r\nRetry-After: 1\r\n'
+                                b'Content-Length: 0\r\n\r\n')
+            client_writer.close()
+            return
+
+        worker.connections += 1
+        try:
+            backend_writer.write(_request_head(head))
+            if new_pin:
+                cookie = f"Set-Cookie: {AFFINITY_COOKIE}={worker.number}; Path=/; HttpOnly; SameSite=Lax".encode()
+                response = _pipe_response(backend_reader, client_writer, cookie)
+            else:
+                response = _pipe(backend_reader, client_writer)
+            upstream = asyncio.create_task(_pipe(client_reader, backend_writer))
+            try:
+                await response
+            finally:
+                # The worker closed the connection: stop waiting on the browser
+                upstream.cancel()
+                backend_writer.close()
+        finally:
+            worker.connections -= 1
+
+    async def monitor(self):
+        """Restart workers that exit"""
+        while True:
+            await asyncio.sleep(MONITOR_SECONDS)
+            for worker in self.workers:
+                if worker.process is not None and not worker.alive:
+                    logger.warning("Trabajador %d terminó con código %s; reiniciando",
+                                   worker.number, worker.process.returncode)
+                    worker.start()
+
+    async def serve(self, host, port):
+        """Balance connections until SIGINT or SIGTERM"""
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEAD_BYTES)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        monitor = asyncio.create_task(self.monitor())
+        logger.info("Balanceador en http://%s:%d con %d trabajadores", host, port, len(self.workers))
+        async with server:
+            await stop.wait()
+        monitor.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trabajadores', type=int, default=WORKERS)
+    parser.add_argument('--puerto', type=int, default=PORT)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--puerto-trabajadores', type=int, default=WORKER_BASE_PORT,
+                        help="port of the first worker; the rest use the following ones")
+    parser.add_argument('--dir-compartido', default=SHARED_DIR, help="directory of the shared dataset files")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    publish_dataset(args.dir_compartido)
+    cookie_secret = secrets.token_hex(32)
+    workers = [Worker(number, args.puerto_trabajadores + number, worker_env(number, args.dir_compartido, cookie_secret))
+               for number in range(args.trabajadores)]
+    for worker in workers:
+        worker.start()
+    try:
+        asyncio.run(Balancer(workers).serve(args.host, args.puerto))
+    finally:
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()
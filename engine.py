@@ -0,0 +1,862 @@
+"""Data layer shared by every dashboard session.
+
+The dashboard script is re-executed on every rerun, so anything that must
+survive between reruns and sessions (the loaded dataset, materialized
+statuses) lives here, keyed by the data version and the calendar day.
+"""
+import glob
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+DATA_FILE = "reporte_danos.xlsx"
+
+# A workbook, a directory of office reports or a glob pattern; several
+# sources are consolidated into one dataset (see load_sources)
+DATA_SOURCE = os.environ.get('DATA_SOURCE', DATA_FILE)
+SOURCE_PATTERN = "reporte_danos*.xlsx"
+# Sheets to read from each workbook: empty for the first one, '*' for all,
+# or comma-separated sheet names
+DATA_SHEETS = os.environ.get('DATA_SHEETS', '')
+# Which source keeps an ID reported by several of them (see PRECEDENCE_RULES)
+DEDUP_PRECEDENCE = os.environ.get('DEDUP_PRECEDENCE', 'reciente')
+LOAD_WORKERS = int(os.environ.get('LOAD_WORKERS', 0)) or os.cpu_count() or 1
+# Directory where dashboard workers share the prepared dataset as memory-mapped
+# Arrow files (see shared_dataset.py and deploy.py); empty to load in-process
+SHARED_DATASET_DIR = os.environ.get('SHARED_DATASET_DIR', '')
+
+# Workbooks above this size are read row by row instead of with pd.read_excel
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+STREAMING_CHUNK_ROWS = 5000
+
+DATE_COLUMNS = ['FEnvío Cap', 'Carta cobertura', '30 Días Pres. Cliente', '69 Días Sol. Aseguradora',
+                'Ejecutivo Fcap', 'Ejecutivo 5 días', 'Ejecutivo 30 días', 'Ejecutivo 69 días',
+                '74 Días Recepcion de  Info. Del cliente', 'Ejecutivo 74 días ', '89 Días Env. Info, al cliente',
+                'Ejecutivo 89 días', '100 Días Solicitud Siniestralidad', 'Ejecutivo 100 días']
+
+# Process definitions: base (deadline) column -> executive action column
+PROCESSES = {
+    'FEnvío Cap': 'Ejecutivo Fcap',
+    'Carta cobertura': 'Ejecutivo 5 días',
+    '30 Días Pres. Cliente': 'Ejecutivo 30 días',
+    '69 Días Sol. Aseguradora': 'Ejecutivo 69 días',
+    '74 Días Recepcion de  Info. Del cliente': 'Ejecutivo 74 días ',
+    '89 Días Env. Info, al cliente': 'Ejecutivo 89 días',
+    '100 Días Solicitud Siniestralidad': 'Ejecutivo 100 días'
+}
+
+# Currencies the summaries split premiums into; other Moneda values are reported by the load profile
+KNOWN_CURRENCIES = ['Nacional', 'Dólares']
+
+# Columns with a row-position index for the sidebar filters
+FILTER_COLUMNS = ['Ejecutivo', 'SRamoNombre', 'Moneda']
+
+# Repeated text is dictionary-encoded; free text is kept as Arrow-backed strings
+CATEGORY_COLUMNS = ['Cliente', 'Ejecutivo', 'SRamoNombre', 'Moneda', 'Cancelaciones']
+TEXT_COLUMNS = ['Pólizas', 'Concepto']
+
+logger = logging.getLogger(__name__)
+
+FilterIndex = namedtuple('FilterIndex', ['size', 'values', 'dates'])
+
+_lock = threading.Lock()
+_dataset = {}
+_status_cache = {}
+_cube_cache = {}
+_filter_index_cache = {}
+
+KPI_STATES = ["En Tiempo", "Retrasado", "Pendiente", "Sin Fecha Base"]
+COLOR_PRIORITIES = ["green", "yellow", "red"]
+_NO_DATE = np.iinfo(np.int64).min
+
+
+def _strip_text(series):
+    """Strip surrounding spaces from a text column, leaving non-text columns untouched"""
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        return series.str.strip()
+    return series
+
+
+class LoadProfile:
+    """Data-quality counts gathered while the data is loaded
+
+    _prepare counts rows, cancellations and coerced dates as it converts each
+    chunk; finish() takes the ID, currency and premium counts from the final
+    columns (the currency from the categorical codes), so profiling adds no
+    pass over the rows of its own. Profiles of several files add up with
+    merge().
+    """
+
+    def __init__(self):
+        self.rows = 0                   # raw rows read
+        self.cancelled = 0              # rows dropped by the cancellation filter
+        self.coerced_dates = {}         # date column -> non-empty values that were not dates
+        self.replaced = 0               # rows dropped because another source reported the ID
+        self.missing_ids = 0
+        self.duplicate_ids = 0          # rows whose ID already appeared
+        self.unknown_currencies = {}    # Moneda value outside KNOWN_CURRENCIES -> rows
+        self.non_numeric_premiums = 0   # PrimaNeta values that are not numbers
+
+    def count_dates(self, column, raw, converted):
+        if raw.dtype.kind == 'M':
+            return
+        coerced = int(raw.notna().sum() - converted.notna().sum())
+        if coerced:
+            self.coerced_dates[column] = self.coerced_dates.get(column, 0) + coerced
+
+    def merge(self, other):
+        """Add the counts of another chunk or file; finish() recounts the dataset-level ones"""
+        for name, value in vars(other).items():
+            if isinstance(value, dict):
+                counts = getattr(self, name)
+                for key, count in value.items():
+                    counts[key] = counts.get(key, 0) + count
+            else:
+                setattr(self, name, getattr(self, name) + value)
+        return self
+
+    def finish(self, df):
+        """Counts on the loaded dataset"""
+        if 'ID' in df.columns:
+            ids = df['ID']
+            self.missing_ids = int(ids.isna().sum())
+            self.duplicate_ids = int(ids.duplicated().sum()) - max(self.missing_ids - 1, 0)
+        if 'Moneda' in df.columns:
+            counts = df['Moneda'].value_counts()
+            self.unknown_currencies = {str(value): int(count) for value, count in counts.items()
+                                       if count and value not in KNOWN_CURRENCIES}
+        self.non_numeric_premiums = 0
+        if 'PrimaNeta' in df.columns and not pd.api.types.is_numeric_dtype(df['PrimaNeta']):
+            prima = df['PrimaNeta']
+            self.non_numeric_premiums = int((prima.notna() & pd.to_numeric(prima, errors='coerce').isna()).sum())
+        return self
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values):
+        profile = cls()
+        vars(profile).update(values)
+        return profile
+
+
+def _cancelled_rows(df):
+    """Boolean array of the cancelled registries (Cancelaciones contains 'Si' in any case)"""
+    if 'Cancelaciones' not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    cancelled = df['Cancelaciones'].astype('string').str.upper().str.strip().eq('SI').fillna(False)
+    return cancelled.to_numpy(dtype=bool)
+
+
+ISO_DATE = re.compile(r'\s*\d{4}-\d{2}-\d{2}')
+
+
+def _date_format(column):
+    """Format for the text dates of a column, decided from its first value (None when that is not text)
+
+    Dates written as text are read day first (dd/mm/yyyy), except ISO ones;
+    text that does not look like a date leaves each value to be parsed alone.
+    """
+    values = column.dropna()
+    if values.empty or not isinstance(values.iloc[0], str):
+        return None
+    first = values.iloc[0]
+    if ISO_DATE.match(first):
+        return 'ISO8601'
+    return guess_datetime_format(first.strip(), dayfirst=True) or 'mixed'
+
+
+def _to_datetime(values, date_format):
+    return pd.to_datetime(values, errors='coerce', format=date_format, dayfirst=date_format == 'mixed')
+
+
+def _prepare(df, profile=None, keep_cancelled=False, date_formats=None):
+    """Apply the cancellation filter, name cleaning and date conversion to raw rows
+
+    A LoadProfile passed as `profile` counts the rows, cancellations and dates
+    that could not be converted. With `keep_cancelled` the cancelled rows stay
+    (and are not counted) so a consolidation can decide which source an ID
+    comes from before filtering them; their dates are not profiled.
+    `date_formats` (date column -> format) fixes the formats for every chunk
+    of a load; without it they are decided from these rows.
+    """
+    if profile is not None:
+        profile.rows += len(df)
+    if date_formats is None:
+        date_formats = {col: _date_format(df[col]) for col in DATE_COLUMNS}
+
+    # Filter out cancelled registries
+    cancelled = _cancelled_rows(df)
+    profiled = slice(None)  # rows whose dates are profiled
+    if keep_cancelled:
+        if cancelled.any():
+            profiled = ~cancelled
+    else:
+        df = df[~cancelled]
+        if profile is not None:
+            profile.cancelled += int(cancelled.sum())
+
+    # Clean executive names to remove trailing spaces
+    df['Ejecutivo'] = _strip_text(df['Ejecutivo'])
+
+    # Convert date columns to datetime
+    for col in DATE_COLUMNS:
+        converted = _to_datetime(df[col], date_formats.get(col))
+        if profile is not None:
+            profile.count_dates(col, df[col][profiled], converted[profiled])
+        df[col] = converted
+
+    return df
+
+
+def _text_dtype():
+    """Arrow-backed string dtype with NaN for missing values, or None without pyarrow"""
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except (ImportError, TypeError):
+        return None
+
+
+def _compact(df):
+    """Store repeated text as categoricals and free text as Arrow strings
+
+    Pólizas mixes numbers and text in the workbook; as strings every value
+    displays, exports and matches searches the same way.
+    """
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # Already encoded: drop the categories of rows filtered out since
+                df[col] = df[col].cat.remove_unused_categories()
+            else:
+                df[col] = df[col].astype('category')
+    text_dtype = _text_dtype()
+    if text_dtype is not None:
+        for col in TEXT_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(text_dtype)
+    return df
+
+
+def load_data(path=DATA_FILE, streaming=None, profile=None, keep_cancelled=False):
+    """Load and preprocess the Excel data
+
+    CSV files and workbooks larger than STREAMING_THRESHOLD_BYTES are read in
+    streaming mode unless `streaming` says otherwise. A LoadProfile passed as
+    `profile` receives the data-quality counts of the file. `keep_cancelled`
+    is for consolidation (see _prepare); the profile is then left unfinished.
+    """
+    if streaming is None:
+        streaming = path.lower().endswith('.csv') or os.path.getsize(path) > STREAMING_THRESHOLD_BYTES
+    if streaming:
+        df = load_data_streaming(path, profile=profile, keep_cancelled=keep_cancelled)
+    else:
+        df = _compact(_prepare(pd.read_excel(path), profile, keep_cancelled))
+    if profile is not None and not keep_cancelled:
+        profile.finish(df)
+    return df
+
+
+def _column_names(header):
+    """Column names for a header row, following read_excel's naming of blank and repeated headers"""
+    names, seen = [], {}
+    for position, name in enumerate(header):
+        if name is None:
+            name = f"Unnamed: {position}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _excel_chunks(path, chunk_size):
+    """Yield raw DataFrame chunks from the first sheet, reading the workbook row by row
+
+    Like read_excel, blank rows are skipped and trailing columns that are empty
+    in every row (header included) are dropped.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _column_names(header)
+        width = len(columns)
+
+        chunk = []
+        position = 0
+        used_width = max((i + 1 for i, name in enumerate(header) if name is not None), default=0)
+        for row in rows:
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            last = max((i + 1 for i, value in enumerate(row) if value is not None), default=0)
+            if not last:
+                continue
+            used_width = max(used_width, last)
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame.from_records(chunk, columns=columns, index=pd.RangeIndex(position, position + len(chunk)))
+                position += len(chunk)
+                chunk = []
+        # The final chunk carries only the used columns; load_data_streaming
+        # drops the trailing empty ones from the earlier chunks to match
+        yield pd.DataFrame.from_records(
+            [row[:used_width] for row in chunk], columns=columns[:used_width],
+            index=pd.RangeIndex(position, position + len(chunk))
+        )
+    finally:
+        workbook.close()
+
+
+def load_data_streaming(path=DATA_FILE, chunk_size=STREAMING_CHUNK_ROWS, profile=None, keep_cancelled=False):
+    """Load the data in fixed-size chunks, keeping only the prepared columns in memory
+
+    Each chunk goes through the same cancellation and date rules as load_data,
+    with the date formats decided once, from the first value of each column,
+    so the result does not depend on the chunk size. Its columns are then
+    appended to per-column buffers. The buffers are joined one column at a
+    time at the end, so peak memory stays close to the final dataset plus a
+    single chunk.
+    """
+    if path.lower().endswith('.csv'):
+        chunks = pd.read_csv(path, chunksize=chunk_size)
+    else:
+        chunks = _excel_chunks(path, chunk_size)
+
+    buffers = {}
+    raw_dtypes = {}
+    date_formats = {}
+    index = []
+    for chunk in chunks:
+        for col in DATE_COLUMNS:
+            if col not in date_formats and chunk[col].notna().any():
+                date_formats[col] = _date_format(chunk[col])
+        # Remember what the raw values looked like before cancelled rows are dropped
+        for col in chunk.columns:
+            values = chunk[col].dropna()
+            if not values.empty:
+                raw_dtypes.setdefault(col, set()).add(values.infer_objects().dtype)
+        chunk = _prepare(chunk, profile, keep_cancelled, date_formats)
+        for col in chunk.columns:
+            buffers.setdefault(col, []).append(chunk[col])
+        index.append(chunk.index.to_numpy())
+    # Columns missing from the last chunk were empty throughout
+    columns = list(chunk.columns)
+
+    data = {}
+    for col in list(buffers):
+        if col not in columns:
+            del buffers[col]
+            continue
+        column = pd.concat(buffers.pop(col), ignore_index=True)
+        if column.dtype == object:
+            # Mixed columns keep NaN for empty cells, as read_excel does
+            column = column.infer_objects()
+            if column.dtype == object:
+                column = column.mask(column.isna(), np.nan)
+        if column.isna().all() and len(raw_dtypes.get(col, ())) == 1 and col not in DATE_COLUMNS:
+            # Only cancelled rows had values: keep the type the whole column had
+            column = column.astype(raw_dtypes[col].pop())
+        data[col] = column
+    return _compact(pd.DataFrame(data, copy=False).set_axis(np.concatenate(index)))
+
+
+ALL_SHEETS = '*'
+
+
+def sheet_selection(spec=DATA_SHEETS):
+    """Sheets to read from a DATA_SHEETS value: None (first sheet), ALL_SHEETS or a list of names"""
+    spec = spec.strip()
+    if not spec:
+        return None
+    if spec == ALL_SHEETS:
+        return ALL_SHEETS
+    return [name.strip() for name in spec.split(',') if name.strip()]
+
+
+def resolve_sources(source=DATA_SOURCE):
+    """Files of a data source, sorted by name
+
+    A directory contributes the files matching SOURCE_PATTERN, a glob pattern
+    the files it matches; anything else is a single file.
+    """
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, SOURCE_PATTERN))
+    elif any(char in source for char in '*?['):
+        paths = glob.glob(source)
+    else:
+        return [source]
+    # Skip the lock files Excel leaves next to open workbooks
+    paths = sorted(path for path in paths if not os.path.basename(path).startswith('~$'))
+    if not paths:
+        raise FileNotFoundError(f"No hay archivos de datos en {source}")
+    return paths
+
+
+def _load_workbook(path, sheets=None, keep_cancelled=False):
+    """Prepared rows of each selected sheet of one file, and their LoadProfile
+
+    Runs in a worker process when consolidating. The first sheet alone goes
+    through load_data (streaming included). With several sheets, those without
+    an ID column (notes, catalogs) are skipped. `keep_cancelled` leaves the
+    cancelled rows in, for load_sources to filter after choosing the sources.
+    """
+    profile = LoadProfile()
+    if sheets is None or path.lower().endswith('.csv'):
+        return [load_data(path, profile=profile, keep_cancelled=keep_cancelled)], profile
+    workbook = pd.read_excel(path, sheet_name=None if sheets == ALL_SHEETS else sheets)
+    frames = []
+    for name, raw in workbook.items():
+        if 'ID' not in raw.columns:
+            logger.info("%s: hoja '%s' omitida, no tiene columna ID", path, name)
+            continue
+        frames.append(_compact(_prepare(raw, profile, keep_cancelled)))
+    if not frames:
+        raise ValueError(f"{path}: ninguna hoja seleccionada tiene columna ID")
+    return frames, profile
+
+
+# Which source keeps an ID reported by several sources (a source is one sheet of
+# one file; files are ordered by name, sheets as in the workbook). Each rule is
+# a tie-break chain of columns whose largest values win.
+PRECEDENCE_RULES = {
+    'reciente': ['mtime', 'part'],           # the most recently modified file
+    'orden': ['part'],                       # the last file by name (and last sheet)
+    'avance': ['actions', 'mtime', 'part'],  # the most recorded executive actions, then 'reciente'
+}
+
+
+def deduplicate_sources(df, part, part_mtimes, precedence=DEDUP_PRECEDENCE):
+    """Boolean mask keeping, for each ID found in several sources, only the rows of the preferred one
+
+    `part` is the source number of each row and `part_mtimes` the modification
+    time of each source. IDs repeated within a single source are kept, as when
+    that source is loaded alone, and so are rows without an ID.
+    """
+    keys = pd.DataFrame({'ID': df['ID'].to_numpy(), 'part': part, 'mtime': np.asarray(part_mtimes)[part]})
+    if precedence == 'avance':
+        keys['actions'] = df[list(PROCESSES.values())].notna().sum(axis=1).to_numpy()
+    per_source = keys.dropna(subset=['ID']).groupby(['ID', 'part'], sort=False).agg(
+        {column: 'sum' if column == 'actions' else 'first' for column in keys.columns[2:]}
+    )
+    order = PRECEDENCE_RULES[precedence]
+    winners = per_source.reset_index().sort_values(order, kind='stable').drop_duplicates('ID', keep='last')
+    kept = pd.MultiIndex.from_arrays([keys['ID'], keys['part']]).isin(
+        pd.MultiIndex.from_arrays([winners['ID'], winners['part']])
+    )
+    return kept | keys['ID'].isna().to_numpy()
+
+
+def load_sources(paths, sheets=None, precedence=DEDUP_PRECEDENCE, workers=LOAD_WORKERS, profile=None):
+    """Load several files (and sheets) and consolidate them into one dataset
+
+    Each file is parsed in its own worker process with the same date rules as
+    load_data, so consolidating many offices takes about as long as the
+    largest file. IDs reported by several sources are kept from the one
+    `precedence` prefers (see PRECEDENCE_RULES); cancellations are filtered
+    afterwards, so a claim cancelled in the preferred source is dropped rather
+    than kept from another one. A single file read without a sheet selection
+    is loaded in-process exactly as load_data does. A LoadProfile passed as
+    `profile` receives the counts of every file.
+    """
+    if precedence not in PRECEDENCE_RULES:
+        raise ValueError(f"Regla de precedencia desconocida: {precedence} "
+                         f"(opciones: {', '.join(PRECEDENCE_RULES)})")
+    if len(paths) == 1 and sheets is None:
+        file_df, file_profile = _load_workbook(paths[0])
+        if profile is not None:
+            profile.merge(file_profile)
+        return file_df[0]
+
+    workers = min(workers, len(paths))
+    if workers > 1:
+        # spawn, not fork: the dashboard process runs server and prefetch threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            loaded = list(pool.map(_load_workbook, paths, [sheets] * len(paths), [True] * len(paths)))
+    else:
+        loaded = [_load_workbook(path, sheets, keep_cancelled=True) for path in paths]
+
+    frames, part_mtimes = [], []
+    for path, (sheet_frames, file_profile) in zip(paths, loaded):
+        mtime = os.stat(path).st_mtime_ns
+        frames.extend(sheet_frames)
+        part_mtimes.extend([mtime] * len(sheet_frames))
+        if profile is not None:
+            profile.merge(file_profile)
+
+    part = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    df = pd.concat(frames, ignore_index=True)
+    del frames, loaded
+    # Sources are chosen on every row, cancelled ones included, and only then are cancellations dropped
+    keep = deduplicate_sources(df, part, part_mtimes, precedence)
+    cancelled = _cancelled_rows(df) & keep
+    df = df[keep & ~cancelled].reset_index(drop=True)
+    # Categories differ between files, so the concatenated columns are re-encoded
+    df = _compact(df)
+    if profile is not None:
+        profile.replaced += int(len(keep) - keep.sum())
+        profile.cancelled += int(cancelled.sum())
+        profile.finish(df)
+    return df
+
+
+def get_data_version(path=DATA_SOURCE, paths=None):
+    """Identify the current contents of the data source by path, size and mtime of each file"""
+    paths = resolve_sources(path) if paths is None else paths
+    files = []
+    for file in paths:
+        stat = os.stat(file)
+        files.append((os.path.abspath(file), stat.st_size, stat.st_mtime_ns))
+    if len(files) == 1 and paths[0] == path:
+        return files[0]
+    return (os.path.abspath(path),) + tuple(files)
+
+
+def get_dataset(path=DATA_SOURCE):
+    """Return (version, df), reloading only when a file of the data source changed"""
+    paths = resolve_sources(path)
+    version = get_data_version(path, paths)
+    with _lock:
+        if _dataset.get('version') == version:
+            return version, _dataset['df']
+    profile = LoadProfile()
+    if SHARED_DATASET_DIR:
+        from shared_dataset import load_shared  # only needed by multi-worker deployments
+
+        def load():
+            return load_sources(paths, sheet_selection(), profile=profile), profile.as_dict()
+
+        df, profile_values = load_shared(SHARED_DATASET_DIR, version, load)
+        profile = LoadProfile.from_dict(profile_values)
+    else:
+        df = load_sources(paths, sheet_selection(), profile=profile)
+    with _lock:
+        _dataset.clear()
+        _dataset.update(version=version, df=df, profile=profile)
+    return version, df
+
+
+def get_load_profile(version):
+    """LoadProfile of the loaded dataset, or None once `version` is no longer the loaded one"""
+    with _lock:
+        if _dataset.get('version') == version:
+            return _dataset['profile']
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _status_label(days):
+    """Pending status label for a day count until the deadline"""
+    if days > 1:
+        return f"{days} días restantes"
+    elif days <= 0:
+        return f"{abs(days)} días vencido"
+    else:
+        return "Vence hoy" if days == 0 else f"{days} día(s) restante(s)"
+
+
+def _timing_status(base_date, exec_date):
+    """Timing status and color: was the executive action on or before the base date"""
+    has_base = base_date.notna().to_numpy()
+    has_exec = exec_date.notna().to_numpy()
+    on_time = (exec_date <= base_date).to_numpy()
+    timing_status = np.select(
+        [has_exec & has_base & on_time, has_exec & has_base, has_exec],
+        ["En Tiempo", "Retrasado", "Sin Fecha Base"],
+        default="Pendiente"
+    )
+    timing_color = np.select(
+        [has_exec & has_base & on_time, has_exec & has_base],
+        ["green", "red"],
+        default="yellow"
+    )
+    return has_base, has_exec, timing_status, timing_color
+
+
+def compute_process_status(df, base_column, exec_column, today):
+    """Compute timing and deadline status for one process over all rows"""
+    base_date = df[base_column].dt.normalize()
+    exec_date = df[exec_column].dt.normalize()
+    has_base, has_exec, timing_status, timing_color = _timing_status(base_date, exec_date)
+
+    # Days until deadline for pending rows (date only, relative to today)
+    days = (base_date - pd.Timestamp(today)).dt.days
+    pending = ~has_exec & has_base
+    pending_days = days.to_numpy()[pending].astype(np.int64)
+    labels = {d: _status_label(d) for d in np.unique(pending_days).tolist()}
+
+    status = np.where(has_exec, "Completado", "Sin fecha base").astype(object)
+    status[pending] = [labels[d] for d in pending_days]
+    color_priority = np.where(has_exec, "green", "red").astype(object)
+    color_priority[pending] = np.where(pending_days > 1, "yellow", "red")
+
+    return pd.DataFrame({
+        'Estado Tiempo': pd.Categorical(timing_status, categories=KPI_STATES),
+        'Timing Color': pd.Categorical(timing_color, categories=COLOR_PRIORITIES),
+        'Status': pd.Categorical(status),
+        'Color Priority': pd.Categorical(color_priority, categories=COLOR_PRIORITIES),
+        'Días Restantes': days.where(pd.Series(pending, index=df.index)).astype('Int32'),
+    }, index=df.index)
+
+
+def get_status_frames(version, df, today=None):
+    """Return per-process status frames, materialized once per data version and day
+
+    The cache holds a single entry: a new data version or a new calendar day
+    replaces it, so statuses roll over at midnight without any explicit reset.
+    """
+    if today is None:
+        today = datetime.now().date()
+    key = (version, today)
+    with _lock:
+        frames = _status_cache.get(key)
+    if frames is not None:
+        return frames
+
+    frames = {
+        base_column: compute_process_status(df, base_column, exec_column, today)
+        for base_column, exec_column in PROCESSES.items()
+    }
+    with _lock:
+        _status_cache.clear()
+        _status_cache[key] = frames
+    return frames
+
+
+def _week_number(day_number):
+    """Monday-based week index for days since 1970-01-01 (a Thursday)"""
+    return (day_number + 3) // 7
+
+
+def prima_cents(prima):
+    """PrimaNeta in integer cents, rounded exactly as the '{:,.2f}' display label"""
+    cents = {value: int(f"{value:.2f}".replace('.', '')) for value in prima.dropna().unique()}
+    return prima.map(cents).fillna(0).astype(np.int64).to_numpy()
+
+
+def build_kpi_cube(df):
+    """Pre-aggregate the dataset into executive x process x week/month x currency x state x client cells
+
+    Each row also carries flags telling whether an earlier process of the same
+    claim falls in the same week, the previous or next week, or the same month.
+    The global view keeps only the first process of each claim within a period,
+    so those flags let single-week, two-week and single-month periods be answered
+    from the cube with the same deduplication as the row-level view. Clients
+    are integer codes (-1 when missing), so distinct clients are counted over
+    the selected cells.
+    """
+    client_codes = pd.Series(pd.factorize(df['Cliente'])[0], index=df.index)
+    premium_cents = prima_cents(df['PrimaNeta'])
+    position = np.arange(len(df))
+
+    process_frames = []
+    previous_weeks = []
+    previous_months = []
+    for p, (base_column, exec_column) in enumerate(PROCESSES.items()):
+        base_date = df[base_column].dt.normalize()
+        exec_date = df[exec_column].dt.normalize()
+        has_base, has_exec, timing_status, _ = _timing_status(base_date, exec_date)
+
+        day_number = np.where(has_base, base_date.to_numpy().astype('datetime64[D]').astype(np.int64), _NO_DATE)
+        week = np.where(has_base, _week_number(day_number), _NO_DATE)
+        month_number = base_date.dt.year.fillna(0).astype(np.int64) * 12 + base_date.dt.month.fillna(0).astype(np.int64) - 1
+        month = np.where(has_base, month_number.to_numpy(), _NO_DATE)
+
+        shadow_week = np.zeros(len(df), dtype=bool)
+        shadow_prev_week = np.zeros(len(df), dtype=bool)
+        shadow_next_week = np.zeros(len(df), dtype=bool)
+        shadow_month = np.zeros(len(df), dtype=bool)
+        for earlier_week, earlier_month in zip(previous_weeks, previous_months):
+            shadow_week |= earlier_week == week
+            shadow_prev_week |= earlier_week == week - 1
+            shadow_next_week |= earlier_week == week + 1
+            shadow_month |= earlier_month == month
+        previous_weeks.append(week)
+        previous_months.append(month)
+
+        response_days = (exec_date - base_date).dt.days
+        has_response = (has_exec & has_base) & (response_days >= 0).to_numpy()
+
+        process_frames.append(pd.DataFrame({
+            'Ejecutivo': df['Ejecutivo'].to_numpy(),
+            'Proceso': base_column,
+            'Semana': week,
+            'Mes': month,
+            'Moneda': df['Moneda'].to_numpy(),
+            'Estado Tiempo': timing_status,
+            'shadow_week': shadow_week,
+            'shadow_prev_week': shadow_prev_week,
+            'shadow_next_week': shadow_next_week,
+            'shadow_month': shadow_month,
+            'Casos': 1,
+            'Completados': has_exec.astype(np.int64),
+            'Prima_cents': premium_cents,
+            'Respuesta_dias': np.where(has_response, response_days.fillna(0).to_numpy(), 0).astype(np.int64),
+            'Respuestas': has_response.astype(np.int64),
+            'Cliente': client_codes.to_numpy(),
+            'Orden': p * len(df) + position,
+        })[has_base])
+
+    rows = pd.concat(process_frames, ignore_index=True)
+    dimensions = ['Ejecutivo', 'Proceso', 'Semana', 'Mes', 'Moneda', 'Estado Tiempo',
+                  'shadow_week', 'shadow_prev_week', 'shadow_next_week', 'shadow_month', 'Cliente']
+    cube = rows.groupby(dimensions, dropna=False, sort=False).agg(
+        Casos=('Casos', 'sum'),
+        Completados=('Completados', 'sum'),
+        Prima_cents=('Prima_cents', 'sum'),
+        Respuesta_dias=('Respuesta_dias', 'sum'),
+        Respuestas=('Respuestas', 'sum'),
+        Orden=('Orden', 'min'),
+    ).reset_index()
+    cube.attrs['ids_unique'] = not df['ID'].duplicated().any()
+    return cube
+
+
+def get_kpi_cube(version, df):
+    """Return the KPI cube for a data version, building it on first use"""
+    with _lock:
+        cube = _cube_cache.get(version)
+    if cube is not None:
+        return cube
+    cube = build_kpi_cube(df)
+    with _lock:
+        _cube_cache.clear()
+        _cube_cache[version] = cube
+    return cube
+
+
+def query_kpi_cube(cube, start_date, end_date, selected_executive='Todos', selected_currencies=None, selected_branches=None,
+                   per_process=False):
+    """Select the cube cells answering a period, executive and currency filter
+
+    By default each claim counts once, at its first process in the period (the
+    global view); with per_process every (claim, process) record counts.
+    Returns None when the period is not one week, two consecutive weeks or one
+    calendar month, or when branches are filtered (the cube has no branch
+    dimension), so the caller falls back to the row-level computation.
+    """
+    if as_selection(selected_branches) is not None:
+        return None
+    if not per_process and not cube.attrs.get('ids_unique', False):
+        return None
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    span = (end - start).days + 1
+
+    if start.weekday() == 0 and span in (7, 14):
+        first_week = _week_number((start - pd.Timestamp(0)).days)
+        last_week = _week_number((end - pd.Timestamp(0)).days)
+        week = cube['Semana']
+        if per_process:
+            keep = (week == first_week) | (week == last_week)
+        else:
+            keep = ~cube['shadow_week'] & (
+                ((week == first_week) & ((last_week == first_week) | ~cube['shadow_next_week'])) |
+                ((week == last_week) & (last_week != first_week) & ~cube['shadow_prev_week'])
+            )
+    elif start.day == 1 and end == start + pd.offsets.MonthEnd(0):
+        keep = cube['Mes'] == start.year * 12 + start.month - 1
+        if not per_process:
+            keep &= ~cube['shadow_month']
+    else:
+        return None
+
+    executives = as_selection(selected_executive)
+    if executives is not None:
+        keep &= cube['Ejecutivo'].isin(executives)
+    currencies = as_selection(selected_currencies)
+    if currencies is not None:
+        keep &= cube['Moneda'].isin(currencies)
+    return cube[keep]
+
+
+def as_selection(selected):
+    """Normalize a filter selection: None for 'Todos' or nothing selected, else a list of values"""
+    if selected is None or (isinstance(selected, str) and selected == 'Todos'):
+        return None
+    if isinstance(selected, str):
+        return [selected]
+    selected = list(selected)
+    return selected or None
+
+
+def build_filter_index(df):
+    """Row-position indexes for the sidebar filters and the per-process base dates
+
+    values[column][value] holds the sorted positions of the rows with that
+    value; dates[base_column] holds the non-missing base dates in ascending
+    order with their row positions, so a period is two binary searches.
+    """
+    values = {}
+    for column in FILTER_COLUMNS:
+        codes, uniques = pd.factorize(df[column])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        order = order.astype(np.int32)
+        values[column] = {value: order[bounds[code]:bounds[code + 1]] for code, value in enumerate(uniques)}
+
+    dates = {}
+    for base_column in PROCESSES:
+        base_date = df[base_column].to_numpy()
+        positions = np.flatnonzero(~np.isnat(base_date)).astype(np.int32)
+        order = np.argsort(base_date[positions], kind='stable')
+        dates[base_column] = (base_date[positions][order], positions[order])
+
+    return FilterIndex(len(df), values, dates)
+
+
+def get_filter_index(version, df):
+    """Return the filter index for a data version, building it on first use"""
+    with _lock:
+        index = _filter_index_cache.get(version)
+    if index is not None:
+        return index
+    index = build_filter_index(df)
+    with _lock:
+        _filter_index_cache.clear()
+        _filter_index_cache[version] = index
+    return index
+
+
+def select_rows(filter_index, selections):
+    """Boolean row mask for {column: selected values}, or None when nothing is filtered
+
+    Values selected within a column are combined with OR, columns with AND.
+    """
+    mask = None
+    for column, selected in selections.items():
+        selected = as_selection(selected)
+        if selected is None:
+            continue
+        column_mask = np.zeros(filter_index.size, dtype=bool)
+        positions = filter_index.values[column]
+        for value in selected:
+            if value in positions:
+                column_mask[positions[value]] = True
+        mask = column_mask if mask is None else mask & column_mask
+    return mask
+
+
+def period_positions(filter_index, base_column, start_date, end_date):
+    """Positions, in row order, of the rows whose base date falls within [start_date, end_date]"""
+    base_dates, positions = filter_index.dates[base_column]
+    lo = np.searchsorted(base_dates, np.datetime64(pd.Timestamp(start_date)), side='left')
+    hi = np.searchsorted(base_dates, np.datetime64(pd.Timestamp(end_date)), side='right')
+    return np.sort(positions[lo:hi])
@@ -0,0 +1,51 @@
+"""Display formatting for the dashboard tables.
+
+Columns are formatted once per distinct value: each column is factorized, the
+unique values are turned into labels through memoized helpers, and the labels
+are spread back by code. Labels are cached at module level, so repeated dates
+and amounts cost a dictionary lookup on later reruns and sessions.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+SPANISH_MONTHS = {
+    1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
+    5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
+    9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
+}
+
+
+@lru_cache(maxsize=8192)
+def _date_label(date):
+    return date.strftime('%d/%m/%Y')
+
+
+@lru_cache(maxsize=65536)
+def _amount_label(amount):
+    return f"{amount:,.2f}"
+
+
+@lru_cache(maxsize=1024)
+def format_date_spanish(date):
+    """Convert date to Spanish format: '21 de julio'"""
+    return f"{date.day} de {SPANISH_MONTHS[date.month]}"
+
+
+def _spread(values, label, missing):
+    """Label each distinct value once and spread the labels back over the column"""
+    codes, uniques = pd.factorize(values)
+    labels = np.array([label(value) for value in uniques] + [missing], dtype=object)
+    return labels[codes]
+
+
+def format_dates(dates, missing):
+    """Format a datetime column as 'dd/mm/yyyy', using `missing` for NaT"""
+    return _spread(dates, _date_label, missing)
+
+
+def format_amounts(amounts, currencies):
+    """Format premiums as '$1,234.56' for Nacional and 'USD$1,234.56' otherwise"""
+    symbols = np.where(np.asarray(currencies == 'Nacional', dtype=bool), '$', 'USD$').astype(object)
+    return symbols + _spread(amounts, _amount_label, '0.00')
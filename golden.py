@@ -0,0 +1,726 @@
+"""Differential check of the fast paths against the original row-by-row code.
+
+The reference functions below are the dashboard's original implementations
+of period filtering, missing-date detection, per-process records and the
+executive summary, kept verbatim except that the clock is passed in. The
+check runs them and the current fast paths (vectorized records, the filter
+index, the combined-records deduplication, the KPI cube, the incrementally
+maintained overdue trend against a weekly count from scratch) under the same
+frozen clock, on generated data built around the business-rule boundaries
+(deadline today, tomorrow and the day after, executive action before, on
+and after the base date, repeated IDs, missing values, cancelled rows) and
+on the real data file, and fails on the first difference per case. Loading
+several office files is checked against consolidating their raw rows by
+hand under each precedence rule, cancellations included, and a CSV with dd/mm/yyyy dates streamed at
+two chunk sizes against converting all of it day first. It then
+reports the time spent by each side and the speedup.
+
+Status frames, the filter index and the KPI cube are built once per dataset
+and clock, as in the dashboard, and are timed on their own line. The clock
+is frozen at midnight: the original period filters carried the time of day
+into the start of the week, which the current ones deliberately do not.
+
+Usage: python golden.py [--rows N] [--seed N] [--data reporte_danos.xlsx] [--sin-real]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+import dashboard  # noqa: E402
+import engine  # noqa: E402
+import periods  # noqa: E402
+from dashboard import (combine_process_records, compute_view_records, create_executive_summary,  # noqa: E402
+                       create_executive_summary_from_cube, filter_by_date_range, filter_by_period,
+                       get_all_records_for_process, get_missing_dates, get_period_bounds, record_labels,
+                       summarize_process_records)
+from engine import (DATA_FILE, DATE_COLUMNS, PROCESSES, _compact, _prepare, build_filter_index,  # noqa: E402
+                    build_kpi_cube, compute_process_status, load_data_streaming, load_sources, query_kpi_cube,
+                    resolve_sources)
+from prefetch import view_filters  # noqa: E402
+from trends import TrendAggregates, overdue_series  # noqa: E402
+
+# Periods the original code knew; any other name fell back to both weeks
+ORIGINAL_PERIODS = ["Semana en Curso", "Semana Pasada", "1 Semana Adelante", "2 Semanas Pasadas",
+                    "2 Semanas Adelante", "Mes Pasado", "Mes Actual", "1 Mes Adelante", "Ambas Semanas"]
+
+
+# --- Reference implementations (original code, clock passed in) -------------
+
+def reference_load(raw):
+    df = raw.copy()
+    if 'Cancelaciones' in df.columns:
+        df = df[~df['Cancelaciones'].str.upper().str.strip().eq('SI')]
+    df['Ejecutivo'] = df['Ejecutivo'].str.strip()
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def reference_consolidation(raws, mtimes, precedence):
+    """Several sources as one file: each ID taken whole from one source, then reference_load
+
+    'reciente' prefers the most recently modified source, 'orden' the last
+    one and 'avance' the one with the most executive action dates for the ID,
+    then 'reciente'; cancelled rows take part in the choice like any other.
+    """
+    rows = pd.concat([raw.assign(_part=part, _mtime=mtime) for part, (raw, mtime) in enumerate(zip(raws, mtimes))],
+                     ignore_index=True)
+    rows['_actions'] = sum(pd.to_datetime(rows[col], errors='coerce').notna().astype(int)
+                           for col in PROCESSES.values())
+    order = {'reciente': ['_mtime', '_part'], 'orden': ['_part'], 'avance': ['_actions', '_mtime', '_part']}[precedence]
+    sources = rows.dropna(subset=['ID']).groupby(['ID', '_part'], as_index=False).agg(
+        _mtime=('_mtime', 'first'), _actions=('_actions', 'sum'))
+    winners = sources.sort_values(order, kind='stable').drop_duplicates('ID', keep='last')
+    chosen = rows.set_index(['ID', '_part']).index.isin(winners.set_index(['ID', '_part']).index)
+    rows = rows[chosen | rows['ID'].isna()].drop(columns=['_part', '_mtime', '_actions'])
+    return reference_load(rows).reset_index(drop=True)
+
+
+def _reference_week_range(date):
+    start = date - timedelta(days=date.weekday())
+    end = start + timedelta(days=6)
+    return start, end
+
+
+def reference_filter_by_period(df, period_type, base_column, now):
+    today = now
+    current_week_start, current_week_end = _reference_week_range(today)
+
+    if period_type == "Semana en Curso":
+        start_date, end_date = current_week_start, current_week_end
+    elif period_type == "Semana Pasada":
+        start_date = current_week_start - timedelta(days=7)
+        end_date = current_week_start - timedelta(days=1)
+    elif period_type == "1 Semana Adelante":
+        start_date = current_week_end + timedelta(days=1)
+        end_date = start_date + timedelta(days=6)
+    elif period_type == "2 Semanas Pasadas":
+        start_date = current_week_start - timedelta(days=14)
+        end_date = current_week_start - timedelta(days=1)
+    elif period_type == "2 Semanas Adelante":
+        start_date = current_week_end + timedelta(days=1)
+        end_date = current_week_end + timedelta(days=14)
+    elif period_type == "Mes Pasado":
+        last_month = today.replace(day=1) - timedelta(days=1)
+        start_date = last_month.replace(day=1)
+        end_date = last_month
+    elif period_type == "Mes Actual":
+        start_date = today.replace(day=1)
+        next_month = start_date + timedelta(days=32)
+        end_date = next_month.replace(day=1) - timedelta(days=1)
+    elif period_type == "1 Mes Adelante":
+        start_date = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+        month_after = start_date + timedelta(days=32)
+        end_date = month_after.replace(day=1) - timedelta(days=1)
+    else:  # Both weeks (legacy)
+        start_date = current_week_start - timedelta(days=7)
+        end_date = current_week_end
+    end_date = end_date.replace(hour=23, minute=59, second=59)
+    return df[(df[base_column] >= start_date) & (df[base_column] <= end_date)]
+
+
+def reference_missing_dates(df, column_pairs, now):
+    missing_data = []
+    for idx, row in df.iterrows():
+        missing_actions = []
+        base_columns_used = []
+        for base_col, exec_col in column_pairs.items():
+            if pd.isna(row[exec_col]):
+                missing_actions.append(exec_col)
+                base_columns_used.append(base_col)
+        if missing_actions:
+            base_date = row[base_columns_used[0]] if base_columns_used else None
+            if pd.isna(base_date):
+                days_delay = "Sin fecha"
+            else:
+                days_delay = (now - base_date).days
+            if pd.isna(base_date):
+                formatted_base_date = "Sin fecha"
+            else:
+                formatted_base_date = base_date.strftime('%d/%m/%Y') if pd.notnull(base_date) else "Sin fecha"
+            missing_data.append({
+                'ID': int(row['ID']) if pd.notna(row['ID']) else 0,
+                'Cliente': row['Cliente'],
+                'Pólizas': row['Pólizas'],
+                'Fecha Base': formatted_base_date,
+                'SRamoNombre': row['SRamoNombre'],
+                'Ejecutivo': row['Ejecutivo'],
+                'Base Column': ', '.join(base_columns_used),
+                'PrimaNeta': row['PrimaNeta'],
+                'Días de Retraso': days_delay
+            })
+    return pd.DataFrame(missing_data)
+
+
+def reference_records(df, base_column, exec_column, selected_period, selected_executive, now,
+                      use_calendar=False, start_date=None, end_date=None):
+    if use_calendar and start_date and end_date:
+        period_filtered = df[(df[base_column] >= start_date) & (df[base_column] <= end_date)]
+    else:
+        period_filtered = reference_filter_by_period(df, selected_period, base_column, now)
+    if selected_executive != 'Todos':
+        period_filtered = period_filtered[period_filtered['Ejecutivo'] == selected_executive]
+    if period_filtered.empty:
+        return pd.DataFrame()
+
+    today = now.date()
+    processed_data = []
+    for idx, row in period_filtered.iterrows():
+        base_date = row[base_column]
+        exec_date = row[exec_column]
+
+        if pd.notna(exec_date) and pd.notna(base_date):
+            if exec_date.date() <= base_date.date():
+                timing_status = "En Tiempo"
+                timing_color = "green"
+            else:
+                timing_status = "Retrasado"
+                timing_color = "red"
+        elif pd.notna(exec_date) and pd.isna(base_date):
+            timing_status = "Sin Fecha Base"
+            timing_color = "yellow"
+        else:
+            timing_status = "Pendiente"
+            timing_color = "yellow"
+
+        if pd.notna(exec_date):
+            status = "Completado"
+            color_priority = "green"
+            formatted_exec_date = exec_date.strftime('%d/%m/%Y')
+        else:
+            if pd.isna(base_date):
+                status = "Sin fecha base"
+                color_priority = "red"
+                formatted_exec_date = "Sin acción"
+            else:
+                days_until_deadline = (base_date.date() - today).days
+                if days_until_deadline > 1:
+                    status = f"{days_until_deadline} días restantes"
+                    color_priority = "yellow"
+                else:
+                    if days_until_deadline <= 0:
+                        status = f"{abs(days_until_deadline)} días vencido"
+                    else:
+                        status = "Vence hoy" if days_until_deadline == 0 else f"{days_until_deadline} día(s) restante(s)"
+                    color_priority = "red"
+                formatted_exec_date = "Pendiente"
+
+        formatted_base_date = base_date.strftime('%d/%m/%Y') if pd.notna(base_date) else "Sin fecha"
+        currency = row.get('Moneda', 'Nacional')
+        currency_symbol = '$' if currency == 'Nacional' else 'USD$'
+        formatted_prima = f"{currency_symbol}{row['PrimaNeta']:,.2f}" if pd.notna(row['PrimaNeta']) else f"{currency_symbol}0.00"
+
+        processed_data.append({
+            'ID': int(row['ID']) if pd.notna(row['ID']) else 0,
+            'Cliente': row['Cliente'],
+            'Pólizas': row['Pólizas'],
+            'Fecha Base': formatted_base_date,
+            'Fecha Ejecutivo': formatted_exec_date,
+            'Estado Tiempo': timing_status,
+            'Ejecutivo': row['Ejecutivo'],
+            'PrimaNeta': formatted_prima,
+            'Moneda': currency,
+            'SRamoNombre': row['SRamoNombre'],
+            'Status': status,
+            'Color Priority': color_priority,
+            'Timing Color': timing_color
+        })
+    return pd.DataFrame(processed_data)
+
+
+def reference_combined(process_frames):
+    return pd.concat(process_frames).drop_duplicates(subset=['ID'])
+
+
+def reference_summary(df):
+    if df.empty:
+        return pd.DataFrame()
+    df_copy = df.copy()
+
+    def extract_numeric_prima(prima_str):
+        if pd.isna(prima_str):
+            return 0.0
+        numeric_str = str(prima_str).replace('USD$', '').replace('$', '').replace(',', '')
+        try:
+            return float(numeric_str)
+        except ValueError:
+            return 0.0
+
+    df_copy['PrimaNeta_numeric'] = df_copy['PrimaNeta'].apply(extract_numeric_prima)
+    timing_stats = df_copy.groupby('Ejecutivo')['Estado Tiempo'].value_counts().unstack(fill_value=0)
+
+    summary_data = []
+    for exec_name in df_copy['Ejecutivo'].unique():
+        exec_data = df_copy[df_copy['Ejecutivo'] == exec_name]
+        total_cases = len(exec_data)
+        unique_clients = exec_data['Cliente'].nunique()
+        completed_cases = len(exec_data[exec_data['Color Priority'] == 'green'])
+        completion_rate = round((completed_cases / total_cases * 100), 1) if total_cases > 0 else 0
+
+        en_tiempo = timing_stats.get('En Tiempo', {}).get(exec_name, 0)
+        retrasadas = timing_stats.get('Retrasado', {}).get(exec_name, 0)
+        pendientes = timing_stats.get('Pendiente', {}).get(exec_name, 0)
+        sin_fecha = timing_stats.get('Sin Fecha Base', {}).get(exec_name, 0)
+
+        prima_usd = exec_data[exec_data['Moneda'] == 'Dólares']['PrimaNeta_numeric'].sum()
+        prima_nacional = exec_data[exec_data['Moneda'] == 'Nacional']['PrimaNeta_numeric'].sum()
+
+        summary_data.append({
+            'Ejecutivo': exec_name,
+            'Total Casos': total_cases,
+            'Clientes Únicos': unique_clients,
+            'En Tiempo': en_tiempo,
+            'Retrasadas': retrasadas,
+            'Pendientes': pendientes + sin_fecha,
+            '% Completado': completion_rate,
+            'Prima USD': f"${prima_usd:,.2f}" if prima_usd > 0 else "$0.00",
+            'Prima Nacional': f"${prima_nacional:,.2f}" if prima_nacional > 0 else "$0.00"
+        })
+
+    summary_df = pd.DataFrame(summary_data).set_index('Ejecutivo')
+    return summary_df.sort_values('Total Casos', ascending=False)
+
+
+def reference_overdue(df, today, executive='Todos'):
+    """Overdue records at the end of each week per process, counted from scratch
+
+    A record is open at the end of a week when its base date falls in that
+    week or earlier and its executive action date does not. Weeks with no
+    open records are left out.
+    """
+    if executive != 'Todos':
+        df = df[df['Ejecutivo'] == executive]
+    current_week = pd.Timestamp(today).to_period('W-SUN').start_time
+    rows = []
+    for base_column, exec_column in PROCESSES.items():
+        base_week = df[base_column].dt.normalize().dt.to_period('W-SUN').dt.start_time
+        exec_week = df[exec_column].dt.normalize().dt.to_period('W-SUN').dt.start_time
+        if base_week.isna().all():
+            continue
+        for week in pd.date_range(base_week.min(), current_week, freq='7D'):
+            count = int(((base_week <= week) & ~(exec_week <= week)).sum())
+            if count:
+                rows.append((week, base_column, count))
+    frame = pd.DataFrame(rows, columns=['Semana', 'Proceso', 'Vencidos'])
+    return frame.sort_values(['Semana', 'Proceso'], ignore_index=True)
+
+
+def incremental_overdue(aggregates, today, executive='Todos'):
+    """overdue_series without downsampling, on the same rows as reference_overdue"""
+    frame = overdue_series(aggregates, today, executive, max_points=10 ** 6)
+    if frame.empty:
+        return pd.DataFrame(columns=['Semana', 'Proceso', 'Vencidos'])
+    frame = frame[frame['Vencidos'] != 0]
+    return frame[['Semana', 'Proceso', 'Vencidos']].sort_values(['Semana', 'Proceso'], ignore_index=True)
+
+
+def previous_version(df):
+    """An earlier state of the data: some claims missing, some actions not yet taken, some dates moved"""
+    previous = df.iloc[np.arange(len(df)) % 5 != 0].copy()
+    exec_columns = list(PROCESSES.values())
+    previous.loc[previous.index[::7], exec_columns] = pd.NaT
+    moved = previous.index[::11]
+    previous.loc[moved, list(PROCESSES)] = previous.loc[moved, list(PROCESSES)] - pd.Timedelta(days=9)
+    return previous
+
+
+# --- Data, clock and comparison ----------------------------------------------
+
+def generate_raw(rows, seed, today, unique_ids=False):
+    """Workbook-shaped rows concentrated on the status boundaries around `today`
+
+    With repeated IDs the combined view must keep each claim once; the KPI
+    cube only answers when IDs are unique, hence the option.
+    """
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today)
+
+    def pick(values, missing=0.0):
+        picked = rng.choice(np.array(values, dtype=object), rows)
+        picked[rng.random(rows) < missing] = np.nan
+        return picked
+
+    if unique_ids:
+        ids = rng.permutation(rows).astype(float) + 1
+    else:
+        ids = rng.integers(1, max(2, int(rows * 0.8)), rows).astype(float)  # repeated claims
+        ids[rng.random(rows) < 0.01] = np.nan
+    policies = np.where(rng.random(rows) < 0.5, rng.integers(100000, 999999, rows).astype(object),
+                        [f"D00-{n % 9}-{n:05d}" for n in rng.integers(0, 99999, rows)])
+    policies[rng.random(rows) < 0.03] = np.nan
+    prima = np.round(rng.choice([0.0, 0.005, 0.015, 1234.565, 99999.995], rows) + rng.integers(0, 500000, rows) / 100 *
+                     (rng.random(rows) < 0.8), 3)
+    prima[rng.random(rows) < 0.03] = np.nan
+
+    raw = pd.DataFrame({
+        'ID': ids,
+        'Cliente': pick([f"Cliente {n}" for n in range(max(5, rows // 10))], 0.02),
+        'Pólizas': policies,
+        'Ejecutivo': pick(["Ana Ruiz", "Ana Ruiz ", "Beto Paz", " Carla Mena", "Dario Sol", "Eva Lira", "Fer Gil"], 0.03),
+        'PrimaNeta': prima,
+        'Moneda': pick(["Nacional", "Nacional", "Dólares"], 0.02),
+        'SRamoNombre': pick(["Autos", "Incendio", "Transporte", "Responsabilidad Civil", "Diversos"], 0.02),
+        'Cancelaciones': pick(["No", "Si", " SI ", "si", "NO"], 0.8),
+        'Concepto': pick(["Robo", "Colisión", "Inundación", "Incendio"], 0.1),
+    })
+
+    # Base dates cluster on today +/- 3 days (the yellow/red boundary) over a wide spread
+    for base_column, exec_column in PROCESSES.items():
+        near = rng.integers(-3, 4, rows)
+        far = rng.integers(-400, 120, rows)
+        offsets = np.where(rng.random(rows) < 0.4, near, far)
+        base = today + pd.to_timedelta(offsets, unit='D')
+        with_time = rng.random(rows) < 0.1
+        base = base + pd.to_timedelta(np.where(with_time, rng.integers(0, 86400, rows), 0), unit='s')
+        base = pd.Series(base).where(rng.random(rows) >= 0.15)
+        action = base.fillna(today) + pd.to_timedelta(rng.integers(-5, 11, rows), unit='D')
+        action = action.where(rng.random(rows) >= 0.45)
+        raw[base_column] = base.astype(object)
+        raw[exec_column] = action.astype(object)
+        raw.loc[rng.random(rows) < 0.005, base_column] = "pendiente"  # text in a date column
+    return raw
+
+
+@contextmanager
+def frozen_clock(now):
+    """Make datetime.now() return `now` in the modules behind the fast paths"""
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    modules = (dashboard, engine, periods)
+    saved = [module.datetime for module in modules]
+    for module in modules:
+        module.datetime = FrozenDatetime
+    try:
+        yield
+    finally:
+        for module, original in zip(modules, saved):
+            module.datetime = original
+
+
+def _policy(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def normalize(frame):
+    """Plain values for comparison: process records labelled as shown, no encodings or NaN/None distinctions"""
+    if 'Fecha Ejecutivo' in frame.columns and pd.api.types.is_datetime64_any_dtype(frame['Fecha Ejecutivo']):
+        frame = record_labels(frame)
+    frame = frame.astype(object)
+    frame = frame.where(frame.notna(), None)
+    if 'Pólizas' in frame.columns:
+        frame['Pólizas'] = frame['Pólizas'].map(_policy)
+    return frame
+
+
+class Harness:
+    """Runs reference/fast pairs, collecting differences and time per function"""
+
+    def __init__(self):
+        self.times = defaultdict(lambda: [0, 0.0, 0.0])  # name -> [cases, reference s, fast s]
+        self.failures = []
+        self.last_reference_seconds = 0.0
+
+    def compare(self, name, context, expected, actual):
+        """Record a difference between two results, if any"""
+        if expected.empty and actual.empty:
+            return
+        try:
+            pd.testing.assert_frame_equal(normalize(expected), normalize(actual), check_dtype=False)
+        except AssertionError as e:
+            self.failures.append((name, context, str(e).strip().splitlines()[:6]))
+
+    def check(self, name, context, reference, fast):
+        """Time reference() and fast(), compare their results and return both"""
+        started = time.perf_counter()
+        expected = reference()
+        middle = time.perf_counter()
+        actual = fast()
+        finished = time.perf_counter()
+        entry = self.times[name]
+        entry[0] += 1
+        entry[1] += middle - started
+        entry[2] += finished - middle
+        self.last_reference_seconds = middle - started
+        self.compare(name, context, expected, actual)
+        return expected, actual
+
+    def add_time(self, name, reference_seconds, fast_seconds):
+        entry = self.times[name]
+        entry[0] += 1
+        entry[1] += reference_seconds
+        entry[2] += fast_seconds
+
+
+def clock_moments(df):
+    """Midnights spread over the data: quartiles of the base dates and a month start"""
+    dates = pd.concat([df[base_column] for base_column in PROCESSES]).dropna()
+    moments = [dates.quantile(q).normalize() for q in (0.25, 0.5, 0.75)]
+    moments.append(moments[1].replace(day=1))
+    return [moment.to_pydatetime() for moment in dict.fromkeys(moments)]
+
+
+def run_dataset(harness, label, raw, moments):
+    """Every reference/fast pair on one dataset under each frozen clock"""
+    ref_df = reference_load(raw)
+    df = _compact(_prepare(raw.copy()))
+    top = df['Ejecutivo'].value_counts().index[:2].tolist()
+
+    # Trend aggregates maintained incrementally from an earlier data version
+    started = time.perf_counter()
+    aggregates = TrendAggregates()
+    aggregates.update(('anterior',), previous_version(df))
+    aggregates.update(('actual',), df)
+    harness.add_time("tendencias (actualización incremental)", 0.0, time.perf_counter() - started)
+
+    for now in moments:
+        for executive in ['Todos'] + top:
+            harness.check("overdue_series", f"{label} {now:%Y-%m-%d} {executive}",
+                          lambda: reference_overdue(df, now, executive),
+                          lambda: incremental_overdue(aggregates, now, executive))
+
+        with frozen_clock(now):
+            started = time.perf_counter()
+            status_frames = {base: compute_process_status(df, base, exec_col, now.date())
+                             for base, exec_col in PROCESSES.items()}
+            filter_index = build_filter_index(df)
+            cube = build_kpi_cube(df)
+            harness.add_time("preparación (estados, índice, cubo)", 0.0, time.perf_counter() - started)
+
+            context = f"{label} {now:%Y-%m-%d}"
+            harness.check("get_missing_dates", context,
+                          lambda: reference_missing_dates(ref_df, PROCESSES, now),
+                          lambda: get_missing_dates(df, PROCESSES))
+            some_pairs = dict(list(PROCESSES.items())[2:5])
+            harness.check("get_missing_dates", context + " (3 procesos)",
+                          lambda: reference_missing_dates(ref_df, some_pairs, now),
+                          lambda: get_missing_dates(df, some_pairs))
+
+            views = [(period, period, None, None) for period in ORIGINAL_PERIODS]
+            views += [(f"{start:%Y-%m-%d}..{end:%Y-%m-%d}", None, start, end) for start, end in (
+                (now - timedelta(days=45), now + timedelta(days=15, hours=23, minutes=59, seconds=59)),
+                (now - timedelta(days=400), now + timedelta(days=120)),
+            )]
+            for view_label, period, start, end in views:
+                use_calendar = period is None
+                for base_column in PROCESSES:
+                    if not use_calendar:
+                        harness.check("filter_by_period", f"{context} {view_label} {base_column}",
+                                      lambda: reference_filter_by_period(ref_df, period, base_column, now),
+                                      lambda: filter_by_period(df, period, base_column))
+                    else:
+                        harness.check("filter_by_date_range", f"{context} {view_label} {base_column}",
+                                      lambda: ref_df[(ref_df[base_column] >= start) & (ref_df[base_column] <= end)],
+                                      lambda: filter_by_date_range(df, start, end, base_column))
+
+                for executive in ['Todos'] + top:
+                    view_context = f"{context} {view_label} {executive}"
+                    reference_frames = {}
+                    reference_seconds = 0.0
+                    for base_column, exec_column in PROCESSES.items():
+                        reference_frames[base_column], _ = harness.check(
+                            "get_all_records_for_process", f"{view_context} {base_column}",
+                            lambda: reference_records(ref_df, base_column, exec_column, period, executive, now,
+                                                      use_calendar, start, end).reset_index(drop=True),
+                            lambda: get_all_records_for_process(
+                                df, base_column, exec_column, period, executive, use_calendar, start, end,
+                                status_frames, filter_index).reset_index(drop=True))
+                        reference_seconds += harness.last_reference_seconds
+
+                    # The dashboard path: all processes at once through the filter index
+                    view_period = (start, end) if use_calendar else period
+                    filters = view_filters(None if executive == 'Todos' else [executive], None, None)
+                    started = time.perf_counter()
+                    records = compute_view_records(df, view_period, filters, status_frames, filter_index)
+                    harness.add_time("compute_view_records", reference_seconds, time.perf_counter() - started)
+                    for base_column in PROCESSES:
+                        harness.compare("compute_view_records", f"{view_context} {base_column}",
+                                        reference_frames[base_column], records[base_column].reset_index(drop=True))
+
+                    reference_list = [frame for frame in reference_frames.values() if not frame.empty]
+                    process_frames = [frame for frame in records.values() if not frame.empty]
+                    if not reference_list and not process_frames:
+                        continue
+                    expected_combined, combined = harness.check(
+                        "combine_process_records", view_context,
+                        lambda: reference_combined(reference_list).reset_index(drop=True),
+                        lambda: combine_process_records(process_frames).reset_index(drop=True))
+                    harness.check(
+                        "create_executive_summary", view_context,
+                        lambda: reference_summary(expected_combined).reset_index(),
+                        lambda: create_executive_summary(combined).reset_index())
+                    # Resumen Global per claim and per (claim, process): the per-process reference keeps every row
+                    for per_process, reference_rows in ((False, lambda: expected_combined),
+                                                        (True, lambda: pd.concat(reference_list))):
+                        level_context = f"{view_context} por proceso" if per_process else view_context
+                        harness.check(
+                            "summarize_process_records", level_context,
+                            lambda: reference_summary(reference_rows()).reset_index(),
+                            lambda: summarize_process_records(process_frames, per_process)[1].reset_index())
+                        if not use_calendar:
+                            cells = query_kpi_cube(cube, *get_period_bounds(period), executive, per_process=per_process)
+                            if cells is not None:
+                                harness.check("create_executive_summary_from_cube", level_context,
+                                              lambda: reference_summary(reference_rows()).reset_index(),
+                                              lambda: create_executive_summary_from_cube(cells).reset_index())
+
+
+def run_consolidation(harness, rows, seed, today):
+    """load_sources on three office files against reference_consolidation
+
+    The newest file (by modification time, the first by name) cancels some
+    claims that are active in an older one and reactivates some cancelled
+    there; the third office reports claims of its own.
+    """
+    rng = np.random.default_rng(seed)
+    older = generate_raw(rows, seed, today, unique_ids=True)
+    older['Cancelaciones'] = older['Cancelaciones'].astype(object)
+    active = ~older['Cancelaciones'].astype('string').str.upper().str.strip().eq('SI').fillna(False)
+    newer = older[rng.random(rows) < 0.5].copy()
+    cancelled_ids = newer.loc[active[newer.index] & (rng.random(len(newer)) < 0.3), 'ID']
+    newer.loc[newer['ID'].isin(cancelled_ids), 'Cancelaciones'] = "Si"
+    newer.loc[~active[newer.index], 'Cancelaciones'] = "No"
+    newer[list(PROCESSES.values())[0]] = pd.Timestamp(today)
+    other = generate_raw(rows // 2, seed + 1, today, unique_ids=True)
+    other['ID'] += rows
+
+    with tempfile.TemporaryDirectory() as directory:
+        sources = [("reporte_danos_1.xlsx", newer, 3_000_000_000), ("reporte_danos_2.xlsx", older, 2_000_000_000),
+                   ("reporte_danos_3.xlsx", other, 1_000_000_000)]
+        for name, raw, mtime in sources:
+            path = os.path.join(directory, name)
+            raw.to_excel(path, index=False)
+            os.utime(path, ns=(mtime, mtime))
+        raws = [raw for _, raw, _ in sources]
+        mtimes = [mtime for _, _, mtime in sources]
+        for precedence in ('reciente', 'orden'):
+            context = f"3 oficinas, {precedence}"
+            expected, actual = harness.check(
+                "load_sources", context,
+                lambda: reference_consolidation(raws, mtimes, precedence),
+                lambda: load_sources(resolve_sources(directory), precedence=precedence, workers=1))
+            if precedence == 'reciente':
+                # Cancelled in the newest file, active in an older one: the claim is gone
+                harness.compare("load_sources", f"{context}, cancelados en el más reciente",
+                                actual.iloc[:0], actual[actual['ID'].isin(cancelled_ids)])
+
+
+def run_progress(harness, rows, seed, today):
+    """load_sources with 'avance' on two office files reporting the same claims
+
+    A third of the claims has fewer executive actions in the newer file, a
+    third fewer in the older one and the rest the same, a tie the newer file
+    wins ('reciente'), where 'orden' would take the older one (last by name).
+    """
+    older = generate_raw(rows, seed, today, unique_ids=True)
+    older['Cancelaciones'] = "No"
+    older['Concepto'] = "Oficina antigua"
+    newer = older.assign(Concepto="Oficina nueva")
+    exec_columns = list(PROCESSES.values())
+    group = older['ID'].astype(int) % 3
+    for frame, fewer in ((newer, group == 0), (older, group == 1)):
+        # One recorded action less: the first one of each claim
+        recorded = frame[exec_columns].notna().to_numpy()
+        first = recorded.argmax(axis=1)
+        for position, col in enumerate(exec_columns):
+            frame.loc[fewer & recorded.any(axis=1) & (first == position), col] = np.nan
+    tied_ids = older.loc[(group == 2) | older[exec_columns].notna().sum(axis=1).eq(0), 'ID']
+
+    with tempfile.TemporaryDirectory() as directory:
+        sources = [("reporte_danos_1.xlsx", newer, 2_000_000_000), ("reporte_danos_2.xlsx", older, 1_000_000_000)]
+        for name, raw, mtime in sources:
+            path = os.path.join(directory, name)
+            raw.to_excel(path, index=False)
+            os.utime(path, ns=(mtime, mtime))
+        raws = [raw for _, raw, _ in sources]
+        mtimes = [mtime for _, _, mtime in sources]
+        context = "2 oficinas, avance"
+        _, actual = harness.check(
+            "load_sources", context,
+            lambda: reference_consolidation(raws, mtimes, 'avance'),
+            lambda: load_sources(resolve_sources(directory), precedence='avance', workers=1))
+        tied = actual[actual['ID'].isin(tied_ids)]
+        harness.compare("load_sources", f"{context}, empates por el más reciente",
+                        tied.assign(Concepto="Oficina nueva"), tied)
+
+
+def run_csv(harness, rows, seed, today):
+    """load_data_streaming on a CSV with dd/mm/yyyy dates, at two chunk sizes
+
+    The first dates are ambiguous (day 12 or less), so a format guessed per
+    chunk reads them month first and loses the dates of the other chunks.
+    """
+    raw = generate_raw(rows, seed, today)
+    for col in DATE_COLUMNS:
+        raw.loc[0, col] = pd.Timestamp(today) + pd.Timedelta(days=1)
+        dates = pd.to_datetime(raw[col], errors='coerce')
+        raw[col] = dates.dt.strftime('%d/%m/%Y').where(dates.notna(), raw[col])
+    day_first = raw.assign(**{col: pd.to_datetime(raw[col], errors='coerce', dayfirst=True, format='mixed')
+                              for col in DATE_COLUMNS})
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "reporte_danos.csv")
+        raw.to_csv(path, index=False)
+        for chunk_size in (100, 1000):
+            harness.check("load_data_streaming (CSV)", f"{chunk_size} filas por bloque",
+                          lambda: reference_load(day_first)[['ID'] + DATE_COLUMNS],
+                          lambda: load_data_streaming(path, chunk_size)[['ID'] + DATE_COLUMNS])
+
+
+def report(harness):
+    print(f"{'función':<38} {'casos':>6} {'referencia':>12} {'rápida':>10} {'aceleración':>12}")
+    for name, (cases, reference_seconds, fast_seconds) in harness.times.items():
+        speedup = f"{reference_seconds / fast_seconds:10.1f}x" if reference_seconds and fast_seconds else ""
+        reference_text = f"{reference_seconds * 1000:10.0f} ms" if reference_seconds else ""
+        print(f"{name:<38} {cases:>6} {reference_text:>12} {fast_seconds * 1000:7.0f} ms {speedup:>12}")
+    if harness.failures:
+        print(f"\n{len(harness.failures)} diferencias:")
+        for name, context, message in harness.failures[:20]:
+            print(f"- {name} [{context}]")
+            for line in message:
+                print(f"    {line}")
+    else:
+        print("\nSin diferencias")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=3000, help="rows of generated data")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--data', default=DATA_FILE, help="real data file (default: the dashboard's)")
+    parser.add_argument('--sin-real', action='store_true', help="only the generated data")
+    args = parser.parse_args()
+
+    harness = Harness()
+    today = datetime(2025, 3, 3)  # a Monday; the moments below cover mid-week and month ends too
+    moments = [today, today + timedelta(days=2), datetime(2025, 3, 31), datetime(2025, 12, 31)]
+    run_dataset(harness, "generados", generate_raw(args.rows, args.seed, today), moments)
+    run_dataset(harness, "generados (ID únicos)", generate_raw(args.rows, args.seed + 1, today, True), moments)
+    run_consolidation(harness, args.rows // 3, args.seed + 2, today)
+    run_progress(harness, args.rows // 3, args.seed + 4, today)
+    run_csv(harness, args.rows, args.seed + 3, today)
+    if not args.sin_real:
+        raw = pd.read_excel(args.data)
+        run_dataset(harness, args.data, raw, clock_moments(reference_load(raw)))
+
+    report(harness)
+    sys.exit(1 if harness.failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Append-only daily history of per-(ID, process) statuses.
+
+Each snapshot writes only the (ID, process) rows whose state differs from the
+last recorded one, plus a tombstone for rows that left the data file, so the
+store grows with changes rather than with days. The state on a past date is
+the latest row at or before that date and is resolved inside SQLite, so
+queries never load the full history into memory.
+
+The stored state is the executive, the base and executive action dates, the
+timing status and the color priority. Day counts such as "N días restantes"
+change every day by construction, so they are derived from the stored dates
+for the requested date instead of being written daily.
+
+A snapshot compares and writes under the database write lock, so processes
+sharing the file record each change once; under deploy.py only the first
+worker records them (HISTORY_SNAPSHOTS).
+"""
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from engine import PROCESSES, as_selection
+
+HISTORY_FILE = "historial_danos.sqlite"
+HISTORY_SNAPSHOTS = os.environ.get('HISTORY_SNAPSHOTS', '1') != '0'  # 0: this process only reads the history
+
+_STATE_COLUMNS = ['ejecutivo', 'base_date', 'exec_date', 'estado_tiempo', 'color_priority', 'present']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS status_history (
+    snapshot_date TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    process TEXT NOT NULL,
+    ejecutivo TEXT,
+    base_date TEXT,
+    exec_date TEXT,
+    estado_tiempo TEXT,
+    color_priority TEXT,
+    present INTEGER NOT NULL,
+    PRIMARY KEY (id, process, snapshot_date)
+);
+CREATE INDEX IF NOT EXISTS status_history_date ON status_history (snapshot_date);
+CREATE TABLE IF NOT EXISTS current_state (
+    id INTEGER NOT NULL,
+    process TEXT NOT NULL,
+    ejecutivo TEXT,
+    base_date TEXT,
+    exec_date TEXT,
+    estado_tiempo TEXT,
+    color_priority TEXT,
+    present INTEGER NOT NULL,
+    PRIMARY KEY (id, process)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_date TEXT PRIMARY KEY,
+    rows_written INTEGER NOT NULL
+);
+"""
+
+# Latest row per (id, process) at or before a date; bound as :as_of
+_STATE_AS_OF = """
+SELECT h.id, h.process, h.ejecutivo, h.base_date, h.exec_date, h.estado_tiempo, h.color_priority
+FROM status_history h
+JOIN (
+    SELECT id, process, MAX(snapshot_date) AS snapshot_date
+    FROM status_history
+    WHERE snapshot_date <= :as_of
+    GROUP BY id, process
+) latest USING (id, process, snapshot_date)
+WHERE h.present = 1
+"""
+
+_lock = threading.Lock()
+_recorded = set()
+
+
+def connect(path=HISTORY_FILE):
+    """Open the history database, creating the schema on first use"""
+    con = sqlite3.connect(path, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(_SCHEMA)
+    return con
+
+
+def _iso_dates(series):
+    """Format a datetime column as ISO dates, None for missing values"""
+    return series.dt.strftime('%Y-%m-%d').astype(object).where(series.notna(), None)
+
+
+def _snapshot_rows(df, status_frames):
+    """Build the per-(ID, process) state rows for the current dataset"""
+    frames = []
+    for base_column, exec_column in PROCESSES.items():
+        status = status_frames[base_column]
+        frames.append(pd.DataFrame({
+            'id': df['ID'],
+            'process': base_column,
+            'ejecutivo': df['Ejecutivo'].astype(object).where(df['Ejecutivo'].notna(), None),
+            'base_date': _iso_dates(df[base_column]),
+            'exec_date': _iso_dates(df[exec_column]),
+            'estado_tiempo': status['Estado Tiempo'],
+            'color_priority': status['Color Priority'],
+            'present': 1,
+        }))
+    rows = pd.concat(frames, ignore_index=True)
+    rows = rows[rows['id'].notna()].drop_duplicates(subset=['id', 'process'])
+    rows['id'] = rows['id'].astype('int64')
+    return rows
+
+
+def record_snapshot(df, status_frames, snapshot_date, path=HISTORY_FILE):
+    """Record the state of every (ID, process) on a date, writing only changed rows"""
+    rows = _snapshot_rows(df, status_frames)
+    snapshot_date = pd.Timestamp(snapshot_date).strftime('%Y-%m-%d')
+    changed = " OR ".join(f"c.{col} IS NOT s.{col}" for col in _STATE_COLUMNS)
+    columns = ", ".join(_STATE_COLUMNS)
+
+    con = connect(path)
+    try:
+        with con:
+            # Taken before comparing with current_state, so a concurrent snapshot is seen whole or not at all
+            con.execute("BEGIN IMMEDIATE")
+            con.execute(f"CREATE TEMP TABLE IF NOT EXISTS snapshot (id INTEGER, process TEXT, {columns}, PRIMARY KEY (id, process))")
+            con.execute("DELETE FROM snapshot")
+            con.executemany(
+                "INSERT INTO snapshot VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows[['id', 'process'] + _STATE_COLUMNS].itertuples(index=False, name=None)
+            )
+            written = con.execute(f"""
+                INSERT OR REPLACE INTO status_history (snapshot_date, id, process, {columns})
+                SELECT ?, s.id, s.process, {", ".join("s." + col for col in _STATE_COLUMNS)}
+                FROM snapshot s LEFT JOIN current_state c ON c.id = s.id AND c.process = s.process
+                WHERE c.id IS NULL OR {changed}
+            """, (snapshot_date,)).rowcount
+            # Rows that left the data file get a tombstone so past-date queries stop counting them
+            written += con.execute(f"""
+                INSERT OR REPLACE INTO status_history (snapshot_date, id, process, {columns})
+                SELECT ?, c.id, c.process, c.ejecutivo, c.base_date, c.exec_date, c.estado_tiempo, c.color_priority, 0
+                FROM current_state c
+                WHERE c.present = 1 AND NOT EXISTS (
+                    SELECT 1 FROM snapshot s WHERE s.id = c.id AND s.process = c.process)
+            """, (snapshot_date,)).rowcount
+            con.execute("""
+                UPDATE current_state SET present = 0
+                WHERE present = 1 AND NOT EXISTS (
+                    SELECT 1 FROM snapshot s WHERE s.id = current_state.id AND s.process = current_state.process)
+            """)
+            con.execute(f"INSERT OR REPLACE INTO current_state (id, process, {columns}) SELECT id, process, {columns} FROM snapshot")
+            con.execute("""
+                INSERT INTO snapshots (snapshot_date, rows_written) VALUES (?, ?)
+                ON CONFLICT (snapshot_date) DO UPDATE SET rows_written = rows_written + excluded.rows_written
+            """, (snapshot_date, written))
+    finally:
+        con.close()
+    return written
+
+
+def record_daily_snapshot(version, df, status_frames, today, path=HISTORY_FILE):
+    """Record today's snapshot once per data version and day (never when HISTORY_SNAPSHOTS is off)"""
+    key = (version, today, path)
+    if not HISTORY_SNAPSHOTS:
+        return 0
+    with _lock:
+        if key in _recorded:
+            return 0
+        written = record_snapshot(df, status_frames, today, path)
+        _recorded.add(key)
+    return written
+
+
+def state_as_of(as_of, path=HISTORY_FILE):
+    """State of every (ID, process) present on a date, from the latest row at or before it"""
+    con = connect(path)
+    try:
+        return pd.read_sql_query(_STATE_AS_OF, con, params={'as_of': pd.Timestamp(as_of).strftime('%Y-%m-%d')})
+    finally:
+        con.close()
+
+
+def changes_between(start_date, end_date, path=HISTORY_FILE):
+    """Rows written between two dates (inclusive), in date order"""
+    con = connect(path)
+    try:
+        return pd.read_sql_query(
+            "SELECT * FROM status_history WHERE snapshot_date BETWEEN ? AND ? ORDER BY snapshot_date, id, process",
+            con, params=(pd.Timestamp(start_date).strftime('%Y-%m-%d'), pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+        )
+    finally:
+        con.close()
+
+
+def first_snapshot_date(path=HISTORY_FILE):
+    """Date of the earliest recorded snapshot, or None when the history is empty"""
+    con = connect(path)
+    try:
+        first = con.execute("SELECT MIN(snapshot_date) FROM snapshots").fetchone()[0]
+    finally:
+        con.close()
+    return pd.Timestamp(first).date() if first else None
+
+
+def overdue_counts(as_of, selected_executive='Todos', path=HISTORY_FILE):
+    """Overdue and pending records per process as they stood on a date
+
+    A record is overdue on a date when its base date is on or before it and
+    the executive action was missing or came later.
+    """
+    params = {'as_of': pd.Timestamp(as_of).strftime('%Y-%m-%d')}
+    executive_filter = ""
+    executives = as_selection(selected_executive)
+    if executives is not None:
+        params.update({f"executive_{i}": name for i, name in enumerate(executives)})
+        executive_filter = "WHERE ejecutivo IN (" + ", ".join(f":executive_{i}" for i in range(len(executives))) + ")"
+    query = f"""
+        SELECT process AS Proceso,
+               SUM(base_date <= :as_of AND (exec_date IS NULL OR exec_date > :as_of)) AS Vencidos,
+               SUM(exec_date IS NULL OR exec_date > :as_of) AS Pendientes
+        FROM ({_STATE_AS_OF})
+        {executive_filter}
+        GROUP BY process
+    """
+    con = connect(path)
+    try:
+        counts = pd.read_sql_query(query, con, params=params)
+    finally:
+        con.close()
+    order = {name: position for position, name in enumerate(PROCESSES)}
+    return counts.sort_values('Proceso', key=lambda names: names.map(order)).reset_index(drop=True)
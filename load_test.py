@@ -0,0 +1,173 @@
+"""Load test: concurrent executives changing the dashboard filters.
+
+Each simulated executive opens a session over Streamlit's websocket (through
+the balancer of deploy.py, or against a single `streamlit run` process), runs
+the page once to learn the sidebar widgets, and then, until the test ends,
+picks a period and a random executive, branch and currency selection, reruns
+the script with those widget values and waits for it to finish. Every rerun
+is timed from the request until Streamlit reports the script finished; an
+error is a rerun that shows an exception or does not finish successfully.
+
+The report gives reruns per second, latency percentiles and, behind the
+balancer, how the sessions were spread across workers.
+
+Usage: python load_test.py [--url http://127.0.0.1:8501] [--ejecutivos 20] [--duracion 60] [--pausa 1.0]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from deploy import AFFINITY_COOKIE
+
+STREAM_PATH = "/_stcore/stream"
+PERIOD_LABEL = "📅 Período"
+FILTER_LABELS = ["👤 Ejecutivo", "🏷️ Ramo", "💱 Moneda"]
+RERUN_TIMEOUT_SECONDS = 120
+
+
+class Session:
+    """One browser tab: a websocket session and the widgets its page rendered"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.widgets = {}
+
+    async def rerun(self, states=()):
+        """Rerun the script with the given widget states; returns (seconds, ok)"""
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = ""
+        for widget_id, field, value in states:
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            if field == 'string_array_value':
+                state.string_array_value.data.extend(value)
+            else:
+                setattr(state, field, value)
+
+        started = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        ok = True
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await asyncio.wait_for(self.websocket.recv(), RERUN_TIMEOUT_SECONDS))
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    ok = False
+                elif element_type in ('selectbox', 'multiselect'):
+                    widget = getattr(element, element_type)
+                    self.widgets[widget.label] = (element_type, widget.id, list(widget.options))
+            elif kind == 'script_finished':
+                # Intermediate runs (e.g. a rerun requested by the script) are followed by another one
+                if forward.script_finished == forward.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                return time.perf_counter() - started, ok and forward.script_finished == forward.FINISHED_SUCCESSFULLY
+
+    def random_states(self, rng):
+        """Widget states for a random period and random filter selections"""
+        states = []
+        if PERIOD_LABEL in self.widgets:
+            _, widget_id, options = self.widgets[PERIOD_LABEL]
+            states.append((widget_id, 'string_value', rng.choice(options)))
+        for label in FILTER_LABELS:
+            if label not in self.widgets:
+                continue
+            _, widget_id, options = self.widgets[label]
+            count = rng.choice([0, 0, 1, 1, 2])  # most executives look at one name or at everything
+            states.append((widget_id, 'string_array_value', rng.sample(options, min(count, len(options)))))
+        return states
+
+
+def _worker_of(websocket):
+    """Worker number the balancer pinned this session to, or None without a balancer"""
+    response = getattr(websocket, 'response', None)
+    if response is None:
+        return None
+    for header in response.headers.get_all('Set-Cookie'):
+        cookie = SimpleCookie(header)
+        if AFFINITY_COOKIE in cookie:
+            return cookie[AFFINITY_COOKIE].value
+    return None
+
+
+async def executive(number, url, deadline, pause, results):
+    rng = random.Random(number)
+    parts = urlsplit(url)
+    scheme = 'wss' if parts.scheme == 'https' else 'ws'
+    # Arrivals are spread over the first pause so the first runs do not all coincide
+    await asyncio.sleep(rng.uniform(0, pause))
+    try:
+        async with websockets.connect(f"{scheme}://{parts.netloc}{STREAM_PATH}", subprotocols=['streamlit'],
+                                      max_size=None) as websocket:
+            results['workers'][_worker_of(websocket)] += 1
+            session = Session(websocket)
+            seconds, ok = await session.rerun()
+            results['first'].append(seconds)
+            while time.monotonic() < deadline:
+                await asyncio.sleep(rng.expovariate(1 / pause) if pause else 0)
+                seconds, ok = await session.rerun(session.random_states(rng))
+                results['latencies'].append(seconds)
+                if not ok:
+                    results['errors'] += 1
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+        results['failed_sessions'].append(f"{number}: {type(e).__name__}: {e}")
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(url, executives, duration, pause):
+    results = {'first': [], 'latencies': [], 'errors': 0, 'failed_sessions': [], 'workers': Counter()}
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(executive(number, url, deadline, pause, results) for number in range(executives)))
+    results['elapsed'] = time.monotonic() - started
+    return results
+
+
+def report(results, executives):
+    latencies = results['latencies']
+    print(f"Ejecutivos simulados: {executives}, duración {results['elapsed']:.1f} s")
+    if results['first']:
+        print(f"Primera carga: mediana {statistics.median(results['first']):.2f} s, "
+              f"máximo {max(results['first']):.2f} s")
+    if latencies:
+        print(f"Reruns: {len(latencies)} ({len(latencies) / results['elapsed']:.1f}/s), errores {results['errors']}")
+        print(f"Latencia: p50 {_percentile(latencies, 0.5):.2f} s, p95 {_percentile(latencies, 0.95):.2f} s, "
+              f"máximo {max(latencies):.2f} s")
+    workers = {worker: count for worker, count in results['workers'].items() if worker is not None}
+    if workers:
+        print("Sesiones por trabajador: " + ", ".join(f"{worker}: {count}" for worker, count in sorted(workers.items())))
+    for failure in results['failed_sessions']:
+        print(f"Sesión fallida {failure}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default="http://127.0.0.1:8501", help="balancer or dashboard address")
+    parser.add_argument('--ejecutivos', type=int, default=20, help="concurrent sessions")
+    parser.add_argument('--duracion', type=float, default=60, help="seconds of filter changes")
+    parser.add_argument('--pausa', type=float, default=1.0, help="mean seconds between changes per session")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.url, args.ejecutivos, args.duracion, args.pausa))
+    report(results, args.ejecutivos)
+    if results['errors'] or results['failed_sessions']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Period definitions for the dashboard filters.
+
+Every period is a function from today's date to its first and last day,
+registered under the name shown in the sidebar. resolve_period() turns a name
+into datetime bounds and the Spanish range label once per day; filters and
+titles reuse that result. New periods only need a PERIODS entry.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from formatting import format_date_spanish
+
+Period = namedtuple('Period', ['start', 'end', 'label'])
+
+
+def get_week_range(date):
+    """Get the start and end of the week for a given date"""
+    start = date - timedelta(days=date.weekday())
+    end = start + timedelta(days=6)
+    return start, end
+
+
+def _month_end(date):
+    """Last day of the month containing date"""
+    return (date.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def _quarter_start(date):
+    """First day of the quarter containing date"""
+    return date.replace(month=(date.month - 1) // 3 * 3 + 1, day=1)
+
+
+def _weeks(offset, count):
+    """Whole weeks starting `offset` weeks from the current one"""
+    def bounds(today):
+        week_start, _ = get_week_range(today)
+        start = week_start + timedelta(weeks=offset)
+        return start, start + timedelta(weeks=count) - timedelta(days=1)
+    return bounds
+
+
+def _month(offset):
+    """The calendar month `offset` months from the current one (offset in -1, 0, 1)"""
+    def bounds(today):
+        start = today.replace(day=1)
+        if offset < 0:
+            start = (start - timedelta(days=1)).replace(day=1)
+        elif offset > 0:
+            start = _month_end(start) + timedelta(days=1)
+        return start, _month_end(start)
+    return bounds
+
+
+def _quarter(offset):
+    """The calendar quarter `offset` quarters from the current one (offset in -1, 0)"""
+    def bounds(today):
+        start = _quarter_start(today)
+        if offset < 0:
+            start = _quarter_start(start - timedelta(days=1))
+        end = _month_end(start.replace(month=start.month + 2))
+        return start, end
+    return bounds
+
+
+def _year_to_date(today):
+    return today.replace(month=1, day=1), today
+
+
+def _rolling_days(days):
+    """The last `days` days, today included"""
+    def bounds(today):
+        return today - timedelta(days=days - 1), today
+    return bounds
+
+
+# Sidebar order; names are shown to users
+PERIODS = {
+    "Semana en Curso": _weeks(0, 1),
+    "Semana Pasada": _weeks(-1, 1),
+    "1 Semana Adelante": _weeks(1, 1),
+    "2 Semanas Pasadas": _weeks(-2, 2),
+    "2 Semanas Adelante": _weeks(1, 2),
+    "Mes Pasado": _month(-1),
+    "Mes Actual": _month(0),
+    "1 Mes Adelante": _month(1),
+    "Trimestre Pasado": _quarter(-1),
+    "Trimestre Actual": _quarter(0),
+    "Año a la Fecha": _year_to_date,
+    "Últimos 7 Días": _rolling_days(7),
+    "Últimos 30 Días": _rolling_days(30),
+    "Últimos 90 Días": _rolling_days(90),
+}
+
+# Past week and current week together, for period names that are not registered
+_LEGACY_PERIOD = _weeks(-1, 2)
+
+
+@lru_cache(maxsize=256)
+def _resolve(period_type, today):
+    start, end = PERIODS.get(period_type, _LEGACY_PERIOD)(today)
+    start_date = datetime.combine(start, datetime.min.time())
+    end_date = datetime.combine(end, datetime.min.time()).replace(hour=23, minute=59, second=59)
+    return Period(start_date, end_date, f"{format_date_spanish(start)} al {format_date_spanish(end)}")
+
+
+def resolve_period(period_type, today=None):
+    """Resolve a period name into (start, end, label), cached per period and day"""
+    if today is None:
+        today = datetime.now().date()
+    return _resolve(period_type, today)
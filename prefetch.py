@@ -0,0 +1,101 @@
+"""Background warming of the views users are likely to open next.
+
+Each render records the selected period and filters and then schedules the
+likely next views: every period for the current filters and the most
+selected filters, periods ordered by how often they are picked. One daemon
+thread computes them into the shared result cache at low OS priority, pausing
+between views so interactive reruns keep the interpreter, and stops as soon
+as the cache has no room left without evicting entries users asked for.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+from cache import result_cache
+from periods import PERIODS
+
+PREFETCH_FILTERS = 3
+PREFETCH_PAUSE_SECONDS = 0.05
+
+NO_FILTERS = ((), (), ())
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_period_hits = Counter()
+_filter_hits = Counter()
+_pending = None  # (scope, views, compute), replaced by every schedule() call
+_worker = None
+
+
+def view_filters(executives, branches, currencies):
+    """Hashable form of the sidebar filters; an empty selection means 'Todos'"""
+    return tuple(tuple(sorted(selected or ())) for selected in (executives, branches, currencies))
+
+
+def record_selection(period, filters):
+    """Count a rendered selection towards the prefetch ranking"""
+    with _lock:
+        if period is not None:
+            _period_hits[period] += 1
+        _filter_hits[filters] += 1
+
+
+def likely_views(filters):
+    """(period, filters) pairs to warm, most likely first"""
+    with _lock:
+        periods = sorted(PERIODS, key=lambda name: -_period_hits[name])
+        candidates = [filters] + [common for common, _ in _filter_hits.most_common(PREFETCH_FILTERS)]
+    candidates.append(NO_FILTERS)
+    ordered = list(dict.fromkeys(candidates))
+    return [(period, view) for view in ordered for period in periods]
+
+
+def _lower_priority():
+    # Linux applies niceness per thread; elsewhere the pauses are the only throttle
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+def _run():
+    global _pending
+    _lower_priority()
+    while True:
+        _wake.wait()
+        with _lock:
+            work, _pending = _pending, None
+            _wake.clear()
+        if work is None:
+            continue
+        scope, views, compute = work
+        for view in views:
+            if _wake.is_set():
+                break  # a newer schedule() supersedes this one
+            key = scope + ('records',) + view
+            if key in result_cache:
+                continue
+            try:
+                result = compute(*view)
+            except Exception:
+                continue
+            if not result_cache.put(key, result, evict=False):
+                break
+            time.sleep(PREFETCH_PAUSE_SECONDS)
+
+
+def schedule(scope, views, compute):
+    """Warm the 'records' entry of each view with compute(*view), in order
+
+    scope is the (data version, day) prefix of the cache keys. Entries from
+    other scopes are dropped first, since no session can ask for them again.
+    """
+    global _pending, _worker
+    result_cache.retain(lambda key: key[:len(scope)] == scope)
+    with _lock:
+        _pending = (scope, views, compute)
+        _wake.set()
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="view-prefetch", daemon=True)
+            _worker.start()
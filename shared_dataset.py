@@ -0,0 +1,106 @@
+"""Prepared dataset shared between dashboard worker processes.
+
+With several workers (see deploy.py) each would otherwise parse the Excel
+files on its own and keep a private copy of the result. Instead, the first
+worker to see a new data version loads it once and writes it to an Arrow IPC
+file named after the version; every worker then memory-maps that file. The
+pages live once in the OS page cache, and Arrow-backed text and numeric
+columns without missing values are used in place, without copying.
+
+A lock file serializes the writers, so a new version is loaded by a single
+process while the others wait for its file. Files of older versions are
+removed once the new one is written; workers that still map them keep their
+data until they switch.
+"""
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+FILE_PREFIX = "dataset-"
+FILE_SUFFIX = ".arrow"
+LOCK_FILE = ".lock"
+METADATA_KEY = b"dataset_metadata"
+
+
+def dataset_path(directory, version):
+    """Arrow file of a data version inside the shared directory"""
+    digest = hashlib.sha1(repr(version).encode()).hexdigest()[:16]
+    return os.path.join(directory, f"{FILE_PREFIX}{digest}{FILE_SUFFIX}")
+
+
+@contextmanager
+def _exclusive(directory):
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _table(df):
+    """Arrow table for a prepared dataset; object columns mixing types are stored as text"""
+    columns = {}
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                columns[col] = df[col].astype('str').where(df[col].notna())
+    return pa.Table.from_pandas(df.assign(**columns) if columns else df, preserve_index=True)
+
+
+def write_dataset(df, path, metadata=None):
+    """Write the dataset atomically: readers see the whole file or none
+
+    `metadata` (JSON-serializable, such as the load profile) travels in the
+    schema, so every worker gets it along with the data.
+    """
+    table = _table(df)
+    if metadata is not None:
+        table = table.replace_schema_metadata({**table.schema.metadata, METADATA_KEY: json.dumps(metadata)})
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(temporary, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(temporary, path)
+
+
+def read_dataset(path):
+    """Memory-map a shared dataset file; returns (DataFrame, metadata)"""
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    metadata = (table.schema.metadata or {}).get(METADATA_KEY)
+    # One block per column, so columns that need no conversion stay on the mapped pages
+    return table.to_pandas(split_blocks=True), json.loads(metadata) if metadata else None
+
+
+def _remove_stale(directory, keep):
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if path != keep and name.startswith(FILE_PREFIX) and (name.endswith(FILE_SUFFIX) or name.endswith('.tmp')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def load_shared(directory, version, load):
+    """(df, metadata) of `version` from the shared directory
+
+    `load()` returns the same pair; it is called only if no worker has
+    written this version yet.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = dataset_path(directory, version)
+    if not os.path.exists(path):
+        with _exclusive(directory):
+            if not os.path.exists(path):
+                df, metadata = load()
+                write_dataset(df, path, metadata)
+                _remove_stale(directory, keep=path)
+    return read_dataset(path)
+
@@ -0,0 +1,100 @@
+"""Check the dashboard's cold-start budget after a server restart.
+
+Each sample runs in a fresh interpreter with Streamlit already imported, as
+in the server process when it first runs the script, and measures:
+
+- the time to import dashboard (and with it pandas and the project modules),
+  which must stay under IMPORT_BUDGET_SECONDS;
+- the time until the first paint, the import plus the page style, after
+  which the page title is sent while the data loads; it must stay under
+  FIRST_PAINT_BUDGET_SECONDS;
+- that importing dashboard does not load the modules only some views need
+  (LAZY_MODULES); Streamlit itself may already have loaded some of them.
+
+The median of the samples is compared with the budgets; the exit code is 1
+when one is exceeded. With --detalle the slowest imports are listed.
+
+Usage: python startup_check.py [--muestras N] [--detalle]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_BUDGET_SECONDS = 0.8
+FIRST_PAINT_BUDGET_SECONDS = 1.0
+
+# Loaded on demand: plotly.express by the trends tab, openpyxl by Excel reads and exports
+LAZY_MODULES = ['plotly.express', 'openpyxl', 'matplotlib']
+
+_SAMPLE = """
+import json, sys, time
+import streamlit
+preloaded = set(sys.modules)
+started = time.perf_counter()
+import dashboard
+imported = time.perf_counter()
+dashboard.page_style()
+painted = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'first_paint': painted - started,
+    'loaded': sorted((set(sys.modules) - preloaded) & set(%r)),
+}))
+""" % LAZY_MODULES
+
+
+def sample():
+    output = subprocess.run([sys.executable, '-c', _SAMPLE], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(count=15):
+    """Modules with the largest cumulative import time under dashboard (-X importtime)"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import streamlit; import dashboard'],
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name == ' streamlit':
+            rows = []  # modules are listed children first: what follows the top-level streamlit is dashboard's
+            continue
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--muestras', type=int, default=5)
+    parser.add_argument('--detalle', action='store_true', help="list the slowest imports")
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.muestras)]
+    import_seconds = statistics.median(s['import'] for s in samples)
+    paint_seconds = statistics.median(s['first_paint'] for s in samples)
+    loaded = sorted({name for s in samples for name in s['loaded']})
+
+    failures = []
+    if import_seconds > IMPORT_BUDGET_SECONDS:
+        failures.append(f"importación {import_seconds:.3f} s > {IMPORT_BUDGET_SECONDS} s")
+    if paint_seconds > FIRST_PAINT_BUDGET_SECONDS:
+        failures.append(f"primer render {paint_seconds:.3f} s > {FIRST_PAINT_BUDGET_SECONDS} s")
+    if loaded:
+        failures.append(f"módulos cargados al importar: {', '.join(loaded)}")
+
+    print(f"Importación de dashboard: {import_seconds:.3f} s (límite {IMPORT_BUDGET_SECONDS} s)")
+    print(f"Primer render estimado:   {paint_seconds:.3f} s (límite {FIRST_PAINT_BUDGET_SECONDS} s)")
+    if args.detalle:
+        print("\nImportaciones más lentas (acumulado):")
+        for cumulative, name in slowest_imports():
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    if failures:
+        print("\nFuera de presupuesto:\n" + "\n".join(f"- {failure}" for failure in failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Incrementally maintained aggregates behind the trend charts.
+
+The aggregates are kept per executive and process so the charts can honour the
+executive filter. When the data file changes, only the claims whose executive
+or dates changed are subtracted and re-added; unchanged rows are never
+re-aggregated. The changes are found against the dataset of the previous
+version, kept by reference (the frame the engine cached) rather than copied.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from engine import DATE_COLUMNS, PROCESSES, as_selection
+
+MAX_POINTS = 104
+
+AGING_BINS = [0, 8, 16, 31, 61, 91, 181, 366, np.inf]
+AGING_LABELS = ["0-7 días", "8-15 días", "16-30 días", "31-60 días",
+                "61-90 días", "91-180 días", "181-365 días", "Más de 365 días"]
+
+_lock = threading.Lock()
+_aggregates = None
+
+
+def _add(total, delta):
+    """Add a delta series into an aggregate series, dropping cells that reach zero"""
+    if delta.empty:
+        return total
+    total = delta if total is None else total.add(delta, fill_value=0)
+    nonzero = total != 0
+    if isinstance(total, pd.DataFrame):
+        nonzero = nonzero.any(axis=1)
+    return total[nonzero]
+
+
+class TrendAggregates:
+    """Weekly completion counts, overdue deltas and pending backlog by base date"""
+
+    def __init__(self):
+        self.version = None
+        self.completion = None      # (Ejecutivo, Semana) -> [Casos, Completados]
+        self.overdue_delta = None   # (Ejecutivo, Proceso, Semana) -> change in overdue count
+        self.pending_by_day = None  # (Ejecutivo, Proceso, Fecha Base) -> pending records
+        self._dataset = None        # the dataset of `version` itself, not a copy
+
+    def update(self, version, df):
+        """Bring the aggregates up to date with a new data version"""
+        if version == self.version:
+            return
+        current = _by_id(df)
+        previous = None if self._dataset is None else _by_id(self._dataset)
+
+        if previous is None or not current.index.is_unique or not previous.index.is_unique:
+            self.completion = self.overdue_delta = self.pending_by_day = None
+            self._apply(current, 1)
+        else:
+            common = current.index.intersection(previous.index)
+            old, new = previous.loc[common], current.loc[common]
+            same = (old == new) | (old.isna() & new.isna())
+            changed = common[~same.all(axis=1)]
+            removed = previous.index.difference(current.index)
+            added = current.index.difference(previous.index)
+            self._apply(previous.loc[removed.union(changed)], -1)
+            self._apply(current.loc[added.union(changed)], 1)
+
+        self._dataset = df
+        self.version = version
+
+    def _apply(self, rows, sign):
+        """Add (sign=1) or subtract (sign=-1) the contribution of a set of rows"""
+        if rows.empty:
+            return
+        executive = rows['Ejecutivo'].fillna("Sin ejecutivo")
+        completion, overdue, pending = [], [], []
+
+        for base_column, exec_column in PROCESSES.items():
+            base_date = rows[base_column].dt.normalize()
+            exec_date = rows[exec_column].dt.normalize()
+            has_base = base_date.notna()
+            week = base_date.dt.to_period('W-SUN').dt.start_time
+
+            completion.append(pd.DataFrame({
+                'Ejecutivo': executive, 'Semana': week,
+                'Casos': 1, 'Completados': exec_date.notna().astype(int),
+            })[has_base])
+
+            # A record is overdue from its base date until its executive action date;
+            # one actioned on or before its base date never is
+            overdue.append(pd.DataFrame({
+                'Ejecutivo': executive, 'Proceso': base_column, 'Semana': week, 'Vencidos': 1,
+            })[has_base & ~(exec_date <= base_date)])
+            closed = has_base & (exec_date > base_date)
+            overdue.append(pd.DataFrame({
+                'Ejecutivo': executive, 'Proceso': base_column,
+                'Semana': exec_date.dt.to_period('W-SUN').dt.start_time, 'Vencidos': -1,
+            })[closed])
+
+            pending.append(pd.DataFrame({
+                'Ejecutivo': executive, 'Proceso': base_column, 'Fecha Base': base_date, 'Casos': 1,
+            })[has_base & exec_date.isna()])
+
+        completion = pd.concat(completion).groupby(['Ejecutivo', 'Semana'])[['Casos', 'Completados']].sum()
+        overdue = pd.concat(overdue).groupby(['Ejecutivo', 'Proceso', 'Semana'])['Vencidos'].sum()
+        pending = pd.concat(pending).groupby(['Ejecutivo', 'Proceso', 'Fecha Base'])['Casos'].sum()
+
+        self.completion = _add(self.completion, completion * sign)
+        self.overdue_delta = _add(self.overdue_delta, overdue * sign)
+        self.pending_by_day = _add(self.pending_by_day, pending * sign)
+
+
+def _by_id(df):
+    """The columns the aggregates are built from, indexed by ID"""
+    # Executives as plain values: categoricals of two data versions cannot be compared
+    return df[['ID', 'Ejecutivo'] + DATE_COLUMNS].astype({'Ejecutivo': object}).set_index('ID')
+
+
+def get_trend_aggregates(version, df):
+    """Return the shared trend aggregates, updated to the given data version"""
+    global _aggregates
+    with _lock:
+        if _aggregates is None:
+            _aggregates = TrendAggregates()
+        _aggregates.update(version, df)
+        return _aggregates
+
+
+def _select_executive(series, selected_executive):
+    """Restrict an aggregate to the selected executives, or keep all of them for 'Todos'"""
+    if series is None or series.empty:
+        return None
+    executives = as_selection(selected_executive)
+    if executives is None:
+        return series
+    series = series[series.index.get_level_values('Ejecutivo').isin(executives)]
+    return series if not series.empty else None
+
+
+def _coarsen(frame, date_column, keys, how, max_points):
+    """Downsample a weekly frame to months, quarters or years until it fits max_points"""
+    for freq in ('MS', 'QS', 'YS'):
+        if frame[date_column].nunique() <= max_points:
+            break
+        periods = frame[date_column].dt.to_period(freq[0]).dt.start_time
+        frame = (frame.assign(**{date_column: periods})
+                 .sort_values(date_column, kind='stable')
+                 .groupby(keys + [date_column], as_index=False).agg(how))
+    return frame
+
+
+def completion_series(aggregates, today, selected_executive='Todos', max_points=MAX_POINTS):
+    """Completion rate per executive and week up to the current week, downsampled for the chart"""
+    completion = _select_executive(aggregates.completion, selected_executive)
+    if completion is None:
+        return pd.DataFrame()
+    frame = completion.reset_index()
+    frame = frame[frame['Semana'] <= pd.Timestamp(today)]
+    if frame.empty:
+        return pd.DataFrame()
+    frame = _coarsen(frame, 'Semana', ['Ejecutivo'], 'sum', max_points)
+    frame['% Completado'] = (frame['Completados'] / frame['Casos'] * 100).round(1)
+    return frame
+
+
+def overdue_series(aggregates, today, selected_executive='Todos', max_points=MAX_POINTS):
+    """Overdue records at the end of each week per process, up to the current week"""
+    overdue = _select_executive(aggregates.overdue_delta, selected_executive)
+    if overdue is None:
+        return pd.DataFrame()
+    current_week = pd.Timestamp(today).to_period('W-SUN').start_time
+    weekly = overdue.groupby(['Proceso', 'Semana']).sum().unstack('Proceso', fill_value=0)
+    weeks = pd.date_range(weekly.index.min(), max(weekly.index.max(), current_week), freq='7D')
+    levels = weekly.reindex(weeks, fill_value=0).cumsum().loc[:current_week]
+    levels.index.name = 'Semana'
+    frame = levels.stack().rename('Vencidos').reset_index()
+    return _coarsen(frame, 'Semana', ['Proceso'], 'last', max_points)
+
+
+def aging_histogram(aggregates, today, selected_executive='Todos'):
+    """Pending records past their base date, binned by days overdue per process"""
+    pending = _select_executive(aggregates.pending_by_day, selected_executive)
+    if pending is None:
+        return pd.DataFrame()
+    frame = pending.groupby(['Proceso', 'Fecha Base']).sum().reset_index()
+    frame['Días Vencido'] = (pd.Timestamp(today) - frame['Fecha Base']).dt.days
+    frame = frame[frame['Días Vencido'] >= 0]
+    frame['Antigüedad'] = pd.cut(frame['Días Vencido'], AGING_BINS, right=False, labels=AGING_LABELS)
+    return frame.groupby(['Antigüedad', 'Proceso'], observed=False)['Casos'].sum().reset_index()